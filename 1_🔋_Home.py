@@ -3,7 +3,17 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
-from backend import rodar_fitting, calcular_arquitetura, executar_modelo_cpp
+from backend import rodar_fitting, calcular_arquitetura, submeter_simulacao
+from progress_channel import formatar_progresso
+from filter_index import IndiceFiltros
+from mtta_engine import mtta_precision
+from mtta_analytic import mtta_mean
+from architecture_sweep import configuracoes, sweep_mtta, pareto_frontier, QUANTIS, MAX_SWEEP_SIMULATIONS
+from fleet_analysis import analisar_frota, resumo_frota, mtta_combinado
+import simulation_jobs
+import result_cache
+import instrumentation
+import uuid
 
 # --- SETUP INICIAL ---
 st.set_page_config(
@@ -19,19 +29,60 @@ col_logo.write("")  # Espaçador
 col_logo.image("logo.png")
 col_header.title("Previsão de falha de Baterias")
 
+CAMINHO_CATALOGO = "Metadata-analysis/HeadersOutput/filenames.csv"
+COLUNAS_FILTRO = ['Institution', 'Form Factor', 'Cathode', 'Temperature (°C)', 'Min SOC (%)', 'Max SOC (%)',
+                  'Charge Rate (C)', 'Discharge Rate (C)', 'Capacity (Ah)']
+
+@st.cache_resource(show_spinner=False)
+def carregar_indice(caminho_arquivo, versao):
+    # Índice dos filtros compartilhado entre as sessões; reconstruído só quando o catálogo muda (versao = mtime)
+    return IndiceFiltros(pd.read_csv(caminho_arquivo), COLUNAS_FILTRO)
+
 def inicializar_dados():
-    # Carrega o dataframe a partir do caminho especificado para o session_state, se ainda não tiver sido carregado
+    # Carrega o catálogo (e seu índice de filtros) a partir do caminho especificado para o session_state
+    try:
+        versao = os.stat(CAMINHO_CATALOGO).st_mtime_ns
+    except FileNotFoundError:
+        st.error(f"**Erro: Arquivo não encontrado!** Verifique se o caminho `{CAMINHO_CATALOGO}` está correto a partir do diretório onde você executa o Streamlit.")
+        st.session_state.df_dados = pd.DataFrame(columns=COLUNAS_FILTRO)
+        return IndiceFiltros(st.session_state.df_dados, COLUNAS_FILTRO)
     if 'df_dados' not in st.session_state:
-        caminho_arquivo = "Metadata-analysis/HeadersOutput/filenames.csv"
-        st.toast(f"Carregando dados de `{caminho_arquivo}`...")
-        try:
-            st.session_state.df_dados = pd.read_csv(caminho_arquivo)
-        except FileNotFoundError:
-            st.error(f"**Erro: Arquivo não encontrado!** Verifique se o caminho `{caminho_arquivo}` está correto a partir do diretório onde você executa o Streamlit.")
-            st.session_state.df_dados = pd.DataFrame()
+        st.toast(f"Carregando dados de `{CAMINHO_CATALOGO}`...")
+    indice = carregar_indice(CAMINHO_CATALOGO, versao)
+    st.session_state.df_dados = indice.df
+    return indice
+
+# Motor da simulação: executável C++ (Rede de Petri) ou o motor em Python/NumPy
+motores = {"Automático": "auto", "Executável C++ (Rede de Petri)": "cpp", "Python (NumPy)": "python", "Analítico (sem sorteio)": "analitico"}
+motor_simulacao = motores[st.sidebar.radio("Motor de simulação:", list(motores), key="motor_simulacao")]
+
+# Modo adaptativo: replicações em blocos até o IC 95% da média e dos quantis atingir a precisão relativa alvo
+adaptativo = st.sidebar.toggle("Replicações adaptativas (motor em Python)", key="replicacoes_adaptativas")
+precisao_alvo = st.sidebar.number_input("Precisão relativa alvo (± %, IC 95%):", min_value=0.1, max_value=20.0, value=1.0, step=0.1, disabled=not adaptativo, key="precisao_alvo") / 100
+max_replicacoes = st.sidebar.number_input("Máximo de replicações:", min_value=500, max_value=1_000_000, value=50_000, step=500, disabled=not adaptativo, key="max_replicacoes")
+
+# Limpeza do SOH antes do fitting (filtros dos notebooks SOH-Analysis, com o perfil de cada instituição)
+limpar_soh = st.sidebar.toggle("Limpar SOH antes do fitting (filtros SOH-Analysis)", key="limpar_soh")
+# Ajuste isotônico (PAVA) do SOH: curva monótona antes da inversão SOH -> ciclo, sem NCD1% negativo
+soh_isotonico = st.sidebar.toggle("Ajuste isotônico do SOH (PAVA)", key="soh_isotonico")
+
+# Estatísticas do cache de resultados (para dimensionar MTTA_CACHE_MAX_BYTES)
+stats_cache = result_cache.read_stats()
+st.sidebar.caption(
+    f"Cache de resultados: {stats_cache['hits']} acerto(s), {stats_cache['misses']} falha(s), "
+    f"{stats_cache['entries']} resultado(s), {stats_cache['bytes'] / 1024**2:.1f} MB de {result_cache.MAX_BYTES / 1024**2:.0f} MB"
+)
+
+# Identificador da sessão na fila de simulações; o heartbeat mantém vivos os jobs desta sessão
+if 'sessao_id' not in st.session_state:
+    st.session_state.sessao_id = uuid.uuid4().hex
+simulation_jobs.heartbeat(st.session_state.sessao_id)
+
+# Tempo e memória por etapa (PERF_SPANS=1): os spans desta execução aparecem no painel da barra lateral, no fim do script
+instrumentation.begin_run(session=st.session_state.sessao_id)
 
 # Executa a inicialização dos dados no início do script
-inicializar_dados()
+indice_filtros = inicializar_dados()
 filenames_df = st.session_state.df_dados
 if filenames_df.empty: st.warning("O DataFrame está vazio")
 
@@ -44,32 +95,33 @@ bat_cap     = -9999999
 st.write("")  # Espaçador
 st.subheader("Insira as informações desejadas")
 
-def criar_selectbox_filtrado(df, coluna, st_element, label=None):
+def criar_selectbox_filtrado(mascara, coluna, st_element, label=None):
+    # Recebe e retorna a máscara (bitmap) das linhas selecionadas; as opções vêm só das linhas da máscara atual
     if label is None: label = coluna
-    opcoes = ["Não especificar"] + df[coluna].unique().tolist()
+    opcoes = ["Não especificar"] + indice_filtros.opcoes(coluna, mascara)
     selecao = st_element.selectbox(
         f"{label}:", options=opcoes,
         key=f"select_{coluna.replace(' ','_').replace('(','').replace(')','').replace('%','')}"
     )
-    return df[df[coluna] == selecao] if selecao != "Não especificar" else df
+    return indice_filtros.filtrar(coluna, selecao, mascara) if selecao != "Não especificar" else mascara
 
 col1, col2, col3 = st.columns([1, 1, 2])
-df_filtered = filenames_df.copy()
+mascara = indice_filtros.todos()
 
 with col1:
     with st.container(border=True, height=230):
-        df_filtered = criar_selectbox_filtrado(df_filtered, 'Institution', st)
-        df_filtered = criar_selectbox_filtrado(df_filtered, 'Form Factor', st)
+        mascara = criar_selectbox_filtrado(mascara, 'Institution', st)
+        mascara = criar_selectbox_filtrado(mascara, 'Form Factor', st)
     with st.container(border=True, height=235):
-        df_filtered = criar_selectbox_filtrado(df_filtered, 'Cathode', st)
-        df_filtered = criar_selectbox_filtrado(df_filtered, 'Temperature (°C)', st)
+        mascara = criar_selectbox_filtrado(mascara, 'Cathode', st)
+        mascara = criar_selectbox_filtrado(mascara, 'Temperature (°C)', st)
 with col2:
     with st.container(border=True, height=230):
-        df_filtered = criar_selectbox_filtrado(df_filtered, 'Min SOC (%)', st)
-        df_filtered = criar_selectbox_filtrado(df_filtered, 'Max SOC (%)', st)
+        mascara = criar_selectbox_filtrado(mascara, 'Min SOC (%)', st)
+        mascara = criar_selectbox_filtrado(mascara, 'Max SOC (%)', st)
     with st.container(border=True, height=235):
-        df_filtered = criar_selectbox_filtrado(df_filtered, 'Charge Rate (C)', st)
-        df_filtered = criar_selectbox_filtrado(df_filtered, 'Discharge Rate (C)', st)
+        mascara = criar_selectbox_filtrado(mascara, 'Charge Rate (C)', st)
+        mascara = criar_selectbox_filtrado(mascara, 'Discharge Rate (C)', st)
 with col3:
     subA_col1, subA_col2 = st.columns(2)
     with subA_col1:
@@ -91,7 +143,7 @@ with col3:
         st.write("**Definir Capacidade Nominal**")
         subB_col1, subB_col2 = st.columns(2)
         with subB_col1:
-            df_filtered = criar_selectbox_filtrado(df_filtered, 'Capacity (Ah)', st, label="Capacidade Célula (Ah)")
+            mascara = criar_selectbox_filtrado(mascara, 'Capacity (Ah)', st, label="Capacidade Célula (Ah)")
                     
         with subB_col2:
             modo_capacidade_bat = st.radio("Modo de entrada:", ["Capacidade", "Corrente e Tempo"], key="modo_capacidade_bat", horizontal=False)
@@ -106,6 +158,7 @@ with col3:
                 #st.info(f"Calculado: {bat_cap:.2f} Ah")
 
 # --- Expander com Resultados Filtrados (em tempo real) ---
+df_filtered = indice_filtros.linhas(mascara)
 st.write("") # Espaçador
 if not df_filtered.empty:
     st.success(f"**{len(df_filtered)}** combinação(ões) encontrada(s) com os filtros atuais.")
@@ -115,17 +168,156 @@ else:
     st.warning("Nenhuma combinação encontrada com os filtros atuais.")
 
 st.write("")
+modo_frota = st.toggle("Modo frota: analisar todas as combinações encontradas (em paralelo)", key="modo_frota")
 gerar_button = st.button("Gerar Análise", type="primary", use_container_width=True)
+
+# --- Varredura de arquiteturas: várias configurações (ns, np, pmin, sp/ps) numa execução só ---
+with st.expander("Varredura de arquiteturas (fronteira de Pareto)"):
+    st.caption("Avalia todas as combinações abaixo, nas duas arquiteturas, com a primeira combinação encontrada e o motor em Python.")
+    sw_col1, sw_col2, sw_col3, sw_col4 = st.columns(4)
+    ns_faixa = sw_col1.slider("Células em série (ns):", 1, 64, (1, 8), key="sweep_ns")
+    np_faixa = sw_col2.slider("Células em paralelo (np):", 1, 32, (1, 6), key="sweep_np")
+    pmin_max = sw_col3.number_input("pmin máximo:", min_value=0, max_value=32, value=2, step=1, key="sweep_pmin")
+    quantil  = sw_col4.selectbox("Quantil do MTTA:", [f"P{q}" for q in QUANTIS], index=1, key="sweep_quantil")
+    sweep_col1, sweep_col2 = st.columns(2)
+    sohm_sweep  = sweep_col1.number_input("SOH mínimo (%):", min_value=1, max_value=99, value=95, step=1, key="sweep_sohm")
+    replicacoes_sweep = sweep_col2.number_input("Replicações:", min_value=100, max_value=100_000, value=2000, step=100, key="sweep_replicacoes")
+    varrer_button = st.button("Varrer Arquiteturas", use_container_width=True)
+
 st.divider()
 
 # --- 3. LÓGICA PRINCIPAL E EXIBIÇÃO DE RESULTADOS ---
-if gerar_button:
+@instrumentation.timed()
+def mostrar_resultados(analise, mtta):
+    n_series, n_paralel, total_cels = analise['n_series'], analise['n_paralel'], analise['total_cels']
+    linha_selecionada, cel_voltage = analise['linha_selecionada'], analise['cel_voltage']
+
+    mtta_df = pd.DataFrame({'SimulationID': np.arange(1, len(mtta) + 1), 'MTTA': mtta}).sort_values(by='MTTA').reset_index(drop=True)
+    n       = len(mtta_df)
+    mtta_df['prob_acumulada'] = np.arange(0, n) / (n - 1) if n > 1 else 1.0
+    
+    st.header("Resultados da Análise:")
+    res_col1, res_col2 = st.columns([1, 2])
+    
+    with res_col1:
+        with st.container(border=True):
+            # 1. Arquitetura da Bateria
+            st.subheader("Arquitetura da Bateria")
+            st.write(f"Células em Série (ns): **{n_series}**")
+            st.write(f"Células em Paralelo (np): **{n_paralel}**")
+            st.write(f"Total de Células: **{total_cels}**")
+            st.success(f"Configuração Final: {n_series}S{n_paralel}P")
+            
+            # 2. Célula Base Utilizada na Simulação
+            st.subheader("Célula Base Selecionada")
+            st.write(f"Cátodo: **{linha_selecionada['Cathode']}**")
+            st.write(f"Formato: **{linha_selecionada['Form Factor']}**")
+            st.write(f"Capacidade: **{linha_selecionada['Capacity (Ah)']:.2f} Ah**")
+            st.write(f"Tensão da Célula: **{cel_voltage:.2f} V**")
+
+            # 3. Precisão atingida pela simulação (meia-largura relativa do IC 95%); a solução analítica não tem erro amostral
+            st.subheader("Precisão da Simulação")
+            if analise.get('motor') == 'analitico':
+                st.write(f"Solução analítica: MTTA médio **{mtta_mean(**analise['parametros']):.1f}** ciclos, sem erro amostral")
+            else:
+                st.write(f"Replicações: **{n}**")
+                for nome, valor in mtta_precision(mtta).items():
+                    st.write(f"{'MTTA médio' if nome == 'mean' else nome}: **±{valor * 100:.2f}%**")
+
+    with res_col2:  
+        with st.container(border=True, height=500):        
+            st.subheader("Probabilidade Acumulada (com Rede de Petri)")
+            st.line_chart(mtta_df, x='MTTA', y='prob_acumulada', height=430, color='#88d574')
+        
+    with st.expander("Ver dados de MTTA gerados pela simulação com Rede de Petri"):
+        st.dataframe(mtta_df)
+
+@instrumentation.timed()
+def mostrar_frota(resultados):
+    resumo = resumo_frota(resultados)
+    combinado = mtta_combinado(resultados)
+    falhas = resumo['Erro'].notna().sum()
+
+    st.header("Resultados da Análise da Frota:")
+    if falhas: st.warning(f"{falhas} de {len(resumo)} célula(s) não puderam ser analisadas (veja a coluna 'Erro').")
+    res_col1, res_col2 = st.columns([1, 2])
+    with res_col1:
+        with st.container(border=True, height=500):
+            st.subheader("Dispersão entre as células")
+            st.write(f"Células analisadas: **{len(resumo) - falhas}**")
+            if len(combinado):
+                st.write(f"MTTA médio (combinado): **{combinado['MTTA'].mean():.1f}** ciclos")
+                if len(resumo) - falhas > 1:
+                    st.write(f"Desvio entre as médias das células: **{resumo['MTTA médio'].std(ddof=1):.1f}** ciclos")
+                st.bar_chart(resumo.dropna(subset=['MTTA médio']), x='Arquivo', y='MTTA médio', height=300, color='#88d574')
+    with res_col2:
+        with st.container(border=True, height=500):
+            st.subheader("Probabilidade Acumulada (todas as células)")
+            st.line_chart(combinado, x='MTTA', y='prob_acumulada', height=430, color='#88d574')
+
+    with st.expander("Ver resumo por célula"):
+        st.dataframe(resumo)
+
+@instrumentation.timed()
+def mostrar_varredura(resultado, quantil):
+    fronteira = pareto_frontier(resultado, valor=quantil)
+    st.header("Varredura de Arquiteturas:")
+    res_col1, res_col2 = st.columns([1, 2])
+    with res_col1:
+        with st.container(border=True, height=500):
+            st.subheader(f"Fronteira de Pareto (células × {quantil})")
+            st.dataframe(fronteira[['architecture', 'ns', 'np', 'pmin', 'total_cels', quantil, 'MTTA médio']], height=400)
+    with res_col2:
+        with st.container(border=True, height=500):
+            st.subheader(f"{quantil} do MTTA por número de células")
+            grafico = resultado.merge(fronteira[['architecture', 'ns', 'np', 'pmin']].assign(Pareto='Fronteira'), how='left').fillna({'Pareto': 'Dominada'})
+            st.scatter_chart(grafico, x='total_cels', y=quantil, color='Pareto', height=430)
+    with st.expander("Ver todas as configurações avaliadas"):
+        st.dataframe(resultado)
+
+@st.fragment(run_every=1.0)
+def acompanhar_simulacao(job_id):
+    # Consulta o job a cada segundo sem bloquear o script; ao terminar, reexecuta a página para mostrar o resultado
+    estado = simulation_jobs.status(job_id, st.session_state.sessao_id)
+    if estado['status'] == simulation_jobs.PENDENTE:
+        st.info(f"Simulação na fila (posição {estado['posicao'] + 1}). Aguardando um processo livre...")
+    elif estado['status'] == simulation_jobs.EXECUTANDO:
+        progresso = estado['progresso']
+        if progresso is None:
+            st.info("Executando a simulação...")
+        else:
+            st.progress(progresso['percentual'] / 100, text=f"Executando a simulação: {formatar_progresso(progresso)}")
+            if progresso['log']: st.code("\n".join(progresso['log']))
+    else:
+        st.rerun()
+
+if gerar_button and modo_frota:
+    st.session_state.analise, st.session_state.frota = None, None
+    simulation_jobs.cancel(st.session_state.sessao_id)
+    if not df_filtered.empty:
+        # Todas as combinações em paralelo; a tabela é atualizada a cada célula concluída
+        caminhos = [f"Battery_Archive_Data_NoSubDirs/{nome}" for nome in df_filtered['Full Filename']]
+        barra_frota = st.progress(0.0, text=f"Analisando {len(caminhos)} célula(s)...")
+        tabela_frota = st.empty()
+        resultados = []
+        for resultado in analisar_frota(caminhos, num_s=1, num_p=1, pmin=0, sohm=95, architecture=bat_arq, limpar=limpar_soh, isotonico=soh_isotonico):
+            resultados.append(resultado)
+            barra_frota.progress(len(resultados) / len(caminhos), text=f"{len(resultados)}/{len(caminhos)} célula(s) analisada(s)")
+            tabela_frota.dataframe(resumo_frota(resultados))
+        barra_frota.empty()
+        tabela_frota.empty()
+        st.session_state.frota = resultados
+    else:
+        st.error("**Nenhuma combinação encontrada.**")
+elif gerar_button:
+    st.session_state.analise, st.session_state.frota = None, None
     if not df_filtered.empty:
         if len(df_filtered) > 1:
             st.info(f"Análise iniciada usando a primeira das {len(df_filtered)} combinações encontradas.")
         
         linha_selecionada = df_filtered.iloc[0]
-        media, desvio_padrao = rodar_fitting(f"Battery_Archive_Data_NoSubDirs/{linha_selecionada['Full Filename']}")
+        caminho_dataset = f"Battery_Archive_Data_NoSubDirs/{linha_selecionada['Full Filename']}"
+        media, desvio_padrao = rodar_fitting(caminho_dataset, limpar=limpar_soh, isotonico=soh_isotonico)
         
         n_series, n_paralel, total_cels = calcular_arquitetura(
             v_bat=bat_voltage,
@@ -133,7 +325,8 @@ if gerar_button:
             C_bat=bat_cap,
             C_cel=linha_selecionada['Capacity (Ah)']
         )
-        resultado_cpp_csv = executar_modelo_cpp(
+        # A simulação vai para a fila compartilhada; uma análise anterior desta sessão ainda em andamento é cancelada
+        parametros = dict(
             mu=media,
             sigma=desvio_padrao,
             num_s= 1, #n_series,
@@ -141,40 +334,64 @@ if gerar_button:
             pmin=0,
             sohm=95,
             architecture=bat_arq,
-            output_dir="MTTA-Output/"
         )
+        job_id = submeter_simulacao(
+            st.session_state.sessao_id,
+            **parametros,
+            motor=motor_simulacao,
+            replicacoes=max_replicacoes if adaptativo else 1000,
+            caminho_dataset=caminho_dataset,
+            precisao=precisao_alvo if adaptativo else None
+        )
+        if job_id is not None:
+            st.session_state.analise = {
+                'job_id': job_id,
+                'n_series': n_series,
+                'n_paralel': n_paralel,
+                'total_cels': total_cels,
+                'linha_selecionada': linha_selecionada,
+                'cel_voltage': cel_voltage,
+                'motor': motor_simulacao,
+                'parametros': parametros,
+            }
+    else:
+        st.error("**Nenhuma combinação encontrada.**")
 
-        mtta_df = pd.read_csv(resultado_cpp_csv).sort_values(by='MTTA').reset_index(drop=True)
-        n       = len(mtta_df)
-        mtta_df['prob_acumulada'] = np.arange(0, n) / (n - 1) if n > 1 else 1.0
-        
-        if resultado_cpp_csv and os.path.exists(resultado_cpp_csv):
-            st.header("Resultados da Análise:")
-            res_col1, res_col2 = st.columns([1, 2])
-            
-            with res_col1:
-                with st.container(border=True):
-                    # 1. Arquitetura da Bateria
-                    st.subheader("Arquitetura da Bateria")
-                    st.write(f"Células em Série (ns): **{n_series}**")
-                    st.write(f"Células em Paralelo (np): **{n_paralel}**")
-                    st.write(f"Total de Células: **{total_cels}**")
-                    st.success(f"Configuração Final: {n_series}S{n_paralel}P")
-                    
-                    # 2. Célula Base Utilizada na Simulação
-                    st.subheader("Célula Base Selecionada")
-                    # Assumindo que 'linha_selecionada' e 'cel_voltage' estão disponíveis
-                    st.write(f"Cátodo: **{linha_selecionada['Cathode']}**")
-                    st.write(f"Formato: **{linha_selecionada['Form Factor']}**")
-                    st.write(f"Capacidade: **{linha_selecionada['Capacity (Ah)']:.2f} Ah**")
-                    st.write(f"Tensão da Célula: **{cel_voltage:.2f} V**")
-
-            with res_col2:  
-                with st.container(border=True, height=500):        
-                    st.subheader("Probabilidade Acumulada (com Rede de Petri)")
-                    st.line_chart(mtta_df, x='MTTA', y='prob_acumulada', height=430, color='#88d574')
-                
-            with st.expander("Ver dados de MTTA gerados pela simulação com Rede de Petri"):
-                st.dataframe(mtta_df)
+if varrer_button:
+    st.session_state.varredura = None
+    configs = configuracoes(range(ns_faixa[0], ns_faixa[1] + 1), range(np_faixa[0], np_faixa[1] + 1), range(0, pmin_max + 1))
+    simulacoes = len(configs) * replicacoes_sweep
+    if simulacoes > MAX_SWEEP_SIMULATIONS:
+        st.error(f"**Varredura grande demais:** {len(configs):,} configurações × {replicacoes_sweep:,} replicações = {simulacoes:,} simulações "
+                 f"(limite: {MAX_SWEEP_SIMULATIONS:,}). Reduza as faixas de ns/np, o pmin máximo ou as replicações.")
+    elif not df_filtered.empty:
+        linha_selecionada = df_filtered.iloc[0]
+        media, desvio_padrao = rodar_fitting(f"Battery_Archive_Data_NoSubDirs/{linha_selecionada['Full Filename']}", limpar=limpar_soh, isotonico=soh_isotonico)
+        if media is not None:
+            with st.spinner(f"Simulando {len(configs)} configurações..."):
+                st.session_state.varredura = sweep_mtta(media, desvio_padrao, configs, sohm=sohm_sweep, replications=replicacoes_sweep)
     else:
-        st.error("**Nenhuma combinação encontrada.**")
\ No newline at end of file
+        st.error("**Nenhuma combinação encontrada.**")
+
+varredura = st.session_state.get('varredura')
+if varredura is not None:
+    mostrar_varredura(varredura, quantil)
+
+frota = st.session_state.get('frota')
+if frota:
+    mostrar_frota(frota)
+
+analise = st.session_state.get('analise')
+if analise:
+    estado = simulation_jobs.status(analise['job_id'], st.session_state.sessao_id)
+    if estado['status'] in simulation_jobs.ATIVOS:
+        acompanhar_simulacao(analise['job_id'])
+    elif estado['status'] == simulation_jobs.CONCLUIDO:
+        mostrar_resultados(analise, estado['resultado'])
+    elif estado['status'] == simulation_jobs.ERRO:
+        st.error("Ocorreu um erro ao executar a simulação.")
+        st.code(estado['erro'])
+    else:
+        st.warning("A simulação foi cancelada ou não está mais disponível. Clique em \"Gerar Análise\" novamente.")
+
+instrumentation.sidebar_panel()
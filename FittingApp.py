@@ -1,10 +1,18 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
 from scipy.stats import norm, kstest
 import matplotlib.pyplot as plt
 import seaborn as sns
+import io
 import os
+from timeseries_cache import read_timeseries
+from ncd import ncd_fit
+from downsampling import lttb
+import result_cache
+import instrumentation
+
+# Pontos por curva no gráfico de visão geral (independe do tamanho do arquivo)
+MAX_POINTS_PER_TRACE = 1000
 
 def select_file():
     st.sidebar.header("Seleção de Arquivo")
@@ -32,12 +40,13 @@ def select_file():
 
     return None
 
+@instrumentation.timed()
 def process_data(file_path):
     try:
-        df = pd.read_csv(file_path)
-        
         # Filtros e preparação inicial
         required_cols = ["Cycle_Index", "Test_Time (s)", "Current (A)", "Voltage (V)", "Discharge_Capacity (Ah)", "Cell_Temperature (C)"]
+        with instrumentation.span('process_data.leitura_csv'):
+            df = read_timeseries(file_path, columns=required_cols)
         df = df[required_cols]
         df_discharge = df[df['Current (A)'] < 0].copy()
         #df_discharge = df_discharge[df_discharge['Cell_Temperature (C)'] >= 1]
@@ -46,27 +55,14 @@ def process_data(file_path):
         nominal_capacity = df_discharge['Discharge_Capacity (Ah)'].max()
         if nominal_capacity == 0: return df_discharge, None
 
-        cycles_capacity = df_discharge.groupby('Cycle_Index')['Discharge_Capacity (Ah)'].max().reset_index()
+        with instrumentation.span('process_data.groupby'):
+            cycles_capacity = df_discharge.groupby('Cycle_Index')['Discharge_Capacity (Ah)'].max().reset_index()
         cycles_capacity.columns = ['Cycle_Index', 'Max_Discharge_Capacity']
         cycles_capacity['SOH_discharge'] = cycles_capacity['Max_Discharge_Capacity'] / nominal_capacity
 
         # Interpolação e cálculo do NCD1%
-        thresholds = np.arange(1.00, 0.00, -0.01)
-        soh = cycles_capacity['SOH_discharge'].values
-        cycles = cycles_capacity['Cycle_Index'].values
-        
-        xp = soh[::-1]
-        fp = cycles[::-1]
-        
-        valid = (thresholds >= xp.min()) & (thresholds <= xp.max())
-        thresholds = thresholds[valid]
-        
-        estimated_cycles = np.interp(thresholds, xp, fp)
-        
-        df_estimates = pd.DataFrame({'SOH_threshold': thresholds, 'estimated_cycle': estimated_cycles})
-        df_estimates['NCD1%'] = df_estimates['estimated_cycle'].diff()
-        
-        ncd1_data = df_estimates['NCD1%'].dropna().values
+        with instrumentation.span('process_data.ncd_fit'):
+            ncd1_data, _, _ = ncd_fit(cycles_capacity['SOH_discharge'].values, cycles_capacity['Cycle_Index'].values)
         
         return df_discharge, ncd1_data
 
@@ -74,6 +70,7 @@ def process_data(file_path):
         st.error(f"Ocorreu um erro ao processar o arquivo: {e}")
         return None, None
 
+@instrumentation.timed()
 def plot_overview(df):
     fig, axs = plt.subplots(2, 2, figsize=(14, 8))
     axs = axs.flatten()
@@ -88,12 +85,16 @@ def plot_overview(df):
     else:
         plot_cycles = cycles
 
+    # Ciclos selecionados extraídos numa única passada; cada curva é reduzida a MAX_POINTS_PER_TRACE pontos (LTTB)
+    df_plot = df.loc[df["Cycle_Index"].isin(plot_cycles), ["Cycle_Index", "Test_Time (s)"] + features]
+    df_plot = df_plot.assign(**{'Tempo_Relativo (s)': df_plot["Test_Time (s)"] - df_plot.groupby("Cycle_Index")["Test_Time (s)"].transform('min')})
+    cycle_groups = list(df_plot.groupby("Cycle_Index"))
+
     for i, feature in enumerate(features):
         ax = axs[i]
-        for cycle in plot_cycles:
-            df_cycle = df[df["Cycle_Index"] == cycle].copy()
-            df_cycle['Tempo_Relativo (s)'] = df_cycle["Test_Time (s)"] - df_cycle["Test_Time (s)"].min()
-            ax.plot(df_cycle['Tempo_Relativo (s)'], df_cycle[feature], alpha=0.7, label=f'Ciclo {int(cycle)}', linewidth=2.0)
+        for cycle, df_cycle in cycle_groups:
+            x, y = lttb(df_cycle['Tempo_Relativo (s)'].values, df_cycle[feature].values, MAX_POINTS_PER_TRACE)
+            ax.plot(x, y, alpha=0.7, label=f'Ciclo {int(cycle)}', linewidth=2.0)
         
         ax.set_title(f'{feature} ao longo dos ciclos')
         ax.set_xlabel('Tempo Relativo (s)')
@@ -104,6 +105,7 @@ def plot_overview(df):
     plt.tight_layout()
     return fig
 
+@instrumentation.timed()
 def plot_ncd_boxplot(data):
     fig, ax = plt.subplots(figsize=(12, 2))
     
@@ -123,6 +125,7 @@ def plot_ncd_boxplot(data):
     
     return fig
 
+@instrumentation.timed()
 def create_cdf_plot(data):
     fig, ax = plt.subplots(figsize=(9, 4))
     
@@ -160,6 +163,36 @@ def perform_ks_test(data):
     - **Conclusão:** `{hypothesis_result}` (Como p-value > alpha, não há evidências para rejeitar a hipótese de que os dados seguem uma distribuição normal).
     """
 
+@instrumentation.timed()
+def figure_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+def analyze_file(file_path, use_cache=True):
+    # Processa o arquivo e renderiza as figuras (PNG), memorizando o resultado no cache de resultados (result_cache),
+    # com chave pelo caminho, tamanho, mtime do arquivo e parâmetros das figuras; o cache tem limite de tamanho (LRU).
+    # Retorna {'ncd1', 'overview_png', 'boxplot_png', 'cdf_png'} (b'' quando a figura não pôde ser gerada) ou None em caso de erro
+    key = result_cache.make_key(tipo='fitting_app', dataset=result_cache.dataset_fingerprint(file_path), max_points=MAX_POINTS_PER_TRACE)
+    cached = result_cache.get(key) if use_cache else None
+    if cached is not None:
+        return {name: value.tobytes() if name.endswith('_png') else value for name, value in cached.items()}
+
+    df_overview, ncd1_data = process_data(file_path)
+    if df_overview is None: return None
+
+    ncd1_data = np.asarray(ncd1_data if ncd1_data is not None else [], dtype=float)
+    analysis = {
+        'ncd1': ncd1_data,
+        'overview_png': figure_png(plot_overview(df_overview)) if not df_overview.empty else b'',
+        'boxplot_png': figure_png(plot_ncd_boxplot(ncd1_data)) if len(ncd1_data) > 1 else b'',
+        'cdf_png': figure_png(create_cdf_plot(ncd1_data)) if len(ncd1_data) > 1 else b'',
+    }
+    if use_cache:
+        result_cache.put(key, **{name: np.frombuffer(value, dtype=np.uint8) if name.endswith('_png') else value for name, value in analysis.items()})
+    return analysis
+
 def main():
     st.set_page_config(layout="wide")
     st.title("Análise de Bateria: Degradação e Teste de Normalidade")
@@ -169,29 +202,28 @@ def main():
     if file_path:
         st.write(f"**Arquivo Selecionado:** `{file_path}`")
         
-        df_overview, ncd1_data = process_data(file_path)
+        analysis = analyze_file(file_path)
+        if analysis is None: return
+        ncd1_data = analysis['ncd1']
         
-        if df_overview is not None and not df_overview.empty:
+        if analysis['overview_png']:
             st.header("Visão Geral do Dataset (Ciclos de Descarga)")
-            overview_plot = plot_overview(df_overview)
-            st.pyplot(overview_plot)
+            st.image(analysis['overview_png'])
         else:
             st.warning("Não foi possível gerar a visão geral do dataset.")
 
-        if ncd1_data is not None and len(ncd1_data) > 1:
+        if len(ncd1_data) > 1:
             st.header("Análise da Degradação (NCD1%)")
             
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader("Distribuição de NCD1%")
-                boxplot = plot_ncd_boxplot(ncd1_data)
-                st.pyplot(boxplot)
+                st.image(analysis['boxplot_png'])
 
             with col2:
                 st.subheader("Gráfico de Distribuição Cumulativa (CDF)")
-                cdf_plot = create_cdf_plot(ncd1_data)
-                st.pyplot(cdf_plot)
+                st.image(analysis['cdf_png'])
             
             st.subheader("Teste de Normalidade")
             ks_results = perform_ks_test(ncd1_data)
@@ -200,4 +232,6 @@ def main():
             st.warning("Não há dados de degradação suficientes no arquivo para realizar a análise completa.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    instrumentation.begin_run()
+    main()
+    instrumentation.sidebar_panel()
\ No newline at end of file
@@ -1,20 +1,55 @@
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 import pandas as pd
 import numpy as np
+import argparse
+import sys
 import os
 
+# Permite importar os módulos compartilhados da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from timeseries_cache import read_timeseries, iter_timeseries_chunks
+
 ERROR_NUM = 999999
+COLUMNS = ['Test_Time (s)', 'Current (A)']
 
 import pandas as pd
 import numpy as np
 
-def manual_weighted_average(df: pd.DataFrame) -> dict:
+def weighted_sums(time: np.ndarray, current: np.ndarray) -> np.ndarray:
     """
-    Calculates the time-weighted average for charge and discharge currents
-    by iterating through the DataFrame rows manually.
+    Vectorized kernel: time-weighted sums for charge and discharge currents.
+
+    Each row is weighted by the time until the NEXT measurement, so the last
+    row has no weight. Zero currents are ignored.
+
+    Args:
+        time: 'Test_Time (s)' values, in chronological order.
+        current: 'Current (A)' values.
+
+    Returns:
+        Array [charge_acc, charge_weight_acc, discharge_acc, discharge_weight_acc].
+    """
+    interval = np.diff(time)
+    current = current[:-1]
+    charge, discharge = current > 0, current < 0
+    return np.array([
+        np.dot(np.where(charge, current, 0.0), interval), np.dot(charge, interval),
+        np.dot(np.where(discharge, current, 0.0), interval), np.dot(discharge, interval),
+    ])
+
+def _averages(sums: np.ndarray) -> dict:
+    # Calcula a média final evitando a divisão por zero
+    charge_acc, charge_weight_acc, discharge_acc, discharge_weight_acc = sums
+    return {
+        'charge_weighted_average': charge_acc / charge_weight_acc if charge_weight_acc > 0 else np.nan,
+        'discharge_weighted_average': discharge_acc / discharge_weight_acc if discharge_weight_acc > 0 else np.nan
+    }
 
-    This function replaces the vectorized np.average(..., weights=...) call.
+def manual_weighted_average(df: pd.DataFrame) -> dict:
+    """
+    Calculates the time-weighted average for charge and discharge currents.
 
     Args:
         df: Pandas DataFrame with 'Test_Time (s)' and 'Current (A)' columns.
@@ -24,78 +59,81 @@ def manual_weighted_average(df: pd.DataFrame) -> dict:
     """
 
     # Garante a ordem cronológica
-    df = df.sort_values("Test_Time (s)").reset_index(drop=True)
-
-    # Calcula o intervalo de tempo até a PRÓXIMA medição. Esse é o peso para a medição da linha ATUAL.
-    df['Time_Interval'] = df['Test_Time (s)'].shift(-1) - df['Test_Time (s)']
-    df['Time_Interval'] = df['Time_Interval'].fillna(0) # O último intervalo é 0
-
-    charge_acc = 0.0  # Acumulador para: Current * Time_Interval (Carga)
-    charge_weight_acc = 0.0   # Acumulador para: Time_Interval (Carga)
-
-    discharge_acc = 0.0 # Acumulador para: Current * Time_Interval (Descarga)
-    discharge_weight_acc = 0.0  # Acumulador para: Time_Interval (Descarga)
-
-    # zip é mais eficiente que df.iterrows()
-    for current, interval in zip(df['Current (A)'], df['Time_Interval']):
-        # Se a corrente for positiva (carga)
-        if current > 0:
-            charge_acc += current * interval
-            charge_weight_acc += interval
-        # Se a corrente for negativa (descarga)
-        elif current < 0:
-            discharge_acc += current * interval
-            discharge_weight_acc += interval
-        # Correntes iguais a zero são ignoradas
+    df = df.sort_values("Test_Time (s)")
+    return _averages(weighted_sums(df['Test_Time (s)'].to_numpy(dtype=float), df['Current (A)'].to_numpy(dtype=float)))
 
-    # Calcula a média final evitando a divisão por zero
-    charge_avg = (
-        charge_acc / charge_weight_acc if charge_weight_acc > 0 else np.nan
-    )
+def chunked_weighted_average(file_path: str, chunksize: int = 500_000) -> dict:
+    """
+    Same result as manual_weighted_average, reading the file in chunks.
+
+    The last row of each chunk is carried into the next one, since its weight
+    depends on the first timestamp of the next chunk. If the file is not in
+    chronological order, falls back to reading the whole file and sorting it.
 
-    discharge_avg = (
-        discharge_acc / discharge_weight_acc if discharge_weight_acc > 0 else np.nan
-    )
+    Args:
+        file_path: Timeseries file (CSV, or its Parquet cache).
+        chunksize: Rows per chunk.
+
+    Returns:
+        A dictionary containing the weighted averages for charge and discharge currents.
+    """
+    sums = np.zeros(4)
+    carry_time, carry_current = np.empty(0), np.empty(0)
+    for chunk in iter_timeseries_chunks(file_path, columns=COLUMNS, chunksize=chunksize):
+        time = np.concatenate([carry_time, chunk['Test_Time (s)'].to_numpy(dtype=float)])
+        current = np.concatenate([carry_current, chunk['Current (A)'].to_numpy(dtype=float)])
+        if np.any(np.diff(time) < 0):
+            return manual_weighted_average(read_timeseries(file_path, columns=COLUMNS))
+        if len(time) > 1: sums += weighted_sums(time, current)
+        carry_time, carry_current = time[-1:], current[-1:]
+    return _averages(sums)
+
+def process_file(file_path: str, chunksize: int = None) -> dict:
+    # Roda num processo do pool: retorna a linha do resultado ou {'error': ...}
+    file_name = os.path.basename(file_path)
+    try:
+        if chunksize:
+            weighted_averages = chunked_weighted_average(file_path, chunksize)
+        else:
+            df = read_timeseries(file_path, columns=COLUMNS)
+            # Verifica se as colunas necessárias existem
+            if 'Current (A)' not in df.columns or 'Test_Time (s)' not in df.columns:
+                return {'error': f"O arquivo '{file_name}' não contém as colunas 'Current (A)' e/ou 'Test_Time (s)'. Pulando."}
+            weighted_averages = manual_weighted_average(df)
+    except Exception as e:
+        return {'error': f"Erro ao processar o arquivo '{file_name}': {e}. Pulando."}
 
     return {
-        'charge_weighted_average': charge_avg,
-        'discharge_weighted_average': discharge_avg
+        'Full Filename': file_name,
+        'Charge Weighted Average (A)': weighted_averages['charge_weighted_average'],
+        'Discharge Weighted Average (A)': weighted_averages['discharge_weighted_average']
     }
 
 # Faça uma main que iniciando no diretório "Battery_Archive_Data", acesse todas as pastas nele informadas numa lista e para cada CSV encontrado, aplique a função de média ponderada. Não crie nenhuma estrutura para testes, os diretórios informados já existem. Cada resultado deve ser escrito num novo arquivo csv com uma coluna contendo o nome do arquivo e outra a média ponderadaa.
-def main():
+def main(workers: int = None, chunksize: int = None):
     folder_path = "Battery_Archive_Data_NoSubDirs"
-    results = []
-    # Itera sobre todos os arquivos dentro da pasta
-    for file_name in tqdm(os.listdir(folder_path)):
-        if file_name.endswith(".csv") and ("timeseries" in file_name):
-            file_path = os.path.join(folder_path, file_name)
-            print(f"  Processando arquivo: {file_name}")
-            try:
-                # Carrega o CSV
-                df = pd.read_csv(file_path)
-
-                # Verifica se as colunas necessárias existem
-                if 'Current (A)' in df.columns and 'Test_Time (s)' in df.columns:
-                    # Aplica a função de média ponderada
-                    weighted_averages = manual_weighted_average(df)
-
-                    # Armazena os resultados
-                    results.append({
-                        'Full Filename': file_name,
-                        'Charge Weighted Average (A)': weighted_averages['charge_weighted_average'],
-                        'Discharge Weighted Average (A)': weighted_averages['discharge_weighted_average']
-                    })
-                else:
-                    print(f"    Erro: O arquivo '{file_name}' não contém as colunas 'Current (A)' e/ou 'Test_Time (s)'. Pulando.")
-
-            except Exception as e:
-                print(f"    Erro ao processar o arquivo '{file_name}': {e}. Pulando.")
-
-    results_df = pd.DataFrame(results)
+    file_names = [f for f in os.listdir(folder_path) if f.endswith(".csv") and ("timeseries" in f)]
+
+    # Um arquivo por processo; os resultados mantêm a ordem da listagem
+    results = [None] * len(file_names)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_file, os.path.join(folder_path, f), chunksize): i for i, f in enumerate(file_names)}
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            results[futures[future]] = future.result()
+
+    for result in results:
+        if 'error' in result: print(f"    Erro: {result['error']}")
+    results_df = pd.DataFrame([r for r in results if 'error' not in r])
     output_csv_name = "Metadata-analysis/CurrentReview/weighted_averages_results.csv"
     results_df.to_csv(output_csv_name)
     print(f"\nProcessamento concluído. Resultados salvos em '{output_csv_name}'")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Calcula as médias de corrente (carga e descarga) ponderadas pelo tempo de cada arquivo timeseries.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Número de processos (padrão: número de núcleos)")
+    parser.add_argument('--chunksize', type=int, default=None, help="Lê cada arquivo em blocos de N linhas (memória limitada); padrão: arquivo inteiro")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    main(workers=args.workers, chunksize=args.chunksize)
\ No newline at end of file
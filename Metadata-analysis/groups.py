@@ -1,32 +1,30 @@
 import json
 import pandas as pd
-from collections import defaultdict
+
+def feature_groups(df, matchingFeatures):
+    # Agrupamento vetorizado (groupby().ngroup()): {str(chave): [arquivos...]}, com grupos e arquivos na ordem de aparição.
+    # A chave é a tupla com os valores de matchingFeatures (escalares do Python, ex.: 25 e não np.int64(25))
+    group_ids = df.groupby(matchingFeatures, sort=False, dropna=False).ngroup().to_numpy()
+    keys = df.loc[~pd.Series(group_ids).duplicated().to_numpy(), matchingFeatures].values.tolist()
+    files = df['Full Filename'].groupby(group_ids).agg(list)
+    return {str(tuple(key)): files.iloc[i] for i, key in enumerate(keys)}
+
+def write_groups(groups, file_name):
+    with open(f'Metadata-analysis/GroupsOutput/{file_name}.json', 'w', encoding='utf-8') as f:
+        json.dump(obj=groups, fp=f, ensure_ascii=False, indent=4)
 
 def group_by_features(df, matchingFeatures, file_name):
     # [matchingFeatures]: ["linha a", "linha b"...]
-    groups_dict = defaultdict(list)
-
-    ### Para cada linha do df, se a chave existir no groups_dict, adicionar na lista dessa chave
-    ### Se não, a nova chave é adicionada e a linha atual é associada
-    # Percorre cada linha do DataFrame
-    for idx, row in df.iterrows():
-        # Monta a tupla que será usada como chave
-        key = tuple(row[matchingFeatures])
-        # Adiciona o índice da linha à lista correspondente
-        groups_dict[key].append(row['Full Filename'])
-
-    converted_dict = defaultdict(list)
-    for key, values in groups_dict.items():
-        print(f"Chave <{key}>\t Tem {len(values)} em comum")
-        converted_dict[str(key)] = (list(values))
-
-    # Salva em JSON
-    json.dump(
-        obj=converted_dict,
-        fp=open(f'Metadata-analysis/GroupsOutput/{file_name}.json', 'w', encoding='utf-8'),
-        ensure_ascii=False,
-        indent=4
-    )
+    groups = feature_groups(df, matchingFeatures)
+    write_groups(groups, file_name)
+    return groups
+
+def vary_one_feature_groups(df, matchingFeatures):
+    # Para cada feature X: grupos em que tudo é igual, exceto X. Retorna {X: {str(chave): [arquivos...]}}
+    return {feature: feature_groups(df, [f for f in matchingFeatures if f != feature]) for feature in matchingFeatures}
+
+def output_name(feature):
+    return OUTPUT_NAMES.get(feature, f"Group - {feature} Variations")
 
 # Removed: 'Institution','Cell ID','Group','Full Filename'
 matchingFeatures = [
@@ -42,18 +40,20 @@ matchingFeatures = [
         'Discharge Current (A)',
     ]
 
-# Grupo A: Apenas Charge Current variando, resto constante. Tudo tem que ser igual, exceto Charge Current
-groupA_matchingFeatures = matchingFeatures.copy()
-groupA_matchingFeatures.remove('Charge Current (A)')
-
-# Grupo B: Apenas Discharge Current variando, resto constante. Tudo tem que ser igual, exceto Discharge Current
-groupB_matchingFeatures = matchingFeatures.copy()
-groupB_matchingFeatures.remove('Discharge Current (A)')
+# Nomes dos JSON já usados para os dois primeiros agrupamentos; as demais features usam "Group - <feature> Variations"
+OUTPUT_NAMES = {
+    'Charge Current (A)': 'Group_A - Charge Current Variations',       # Apenas Charge Current variando, resto constante
+    'Discharge Current (A)': 'Group_B - Discharge Current Variations', # Apenas Discharge Current variando, resto constante
+}
 
-df = pd.read_csv('Metadata-analysis/HeadersOutput/filenames.csv')
+if __name__ == '__main__':
+    df = pd.read_csv('Metadata-analysis/HeadersOutput/filenames.csv')
 
-# Estrutura dos json: [matchingFeatures]: ["linha a", "linha b"...]
-group_by_features(df, groupA_matchingFeatures, 'Group_A - Charge Current Variations')
-group_by_features(df, groupB_matchingFeatures, 'Group_B - Discharge Current Variations')
+    # Estrutura dos json: [matchingFeatures]: ["linha a", "linha b"...]
+    # Um agrupamento "tudo igual, exceto X" para cada feature de matchingFeatures
+    for feature, groups in vary_one_feature_groups(df, matchingFeatures).items():
+        write_groups(groups, output_name(feature))
+        comparable = sum(len(files) > 1 for files in groups.values())
+        print(f"{feature}: {len(groups)} grupo(s), {comparable} com mais de um arquivo")
 
-print(f"Grupos salvos com sucesso")
+    print(f"Grupos salvos com sucesso")
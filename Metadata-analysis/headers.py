@@ -1,61 +1,127 @@
-from scipy.stats import norm
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 import pandas as pd
 import numpy as np
+import argparse
+import json
+import sys
 import os
 
+# Permite importar os módulos compartilhados da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cycle_stats import load_cycle_frames
+from ncd import ncd_fit
+
 # Metadata-analysis/
 PATH_DESCRIPTION_FILE = 'Metadata-analysis/HeadersOutput/headers_description.txt'
 PATH_LIST_FILE = 'Metadata-analysis/HeadersOutput/z - filenames.txt'
 PATH_CSV_FILE = 'Metadata-analysis/HeadersOutput/filenames.csv'
+PATH_CHECKPOINT_FILE = 'Metadata-analysis/HeadersOutput/ncd_checkpoint.jsonl'
+PATH_INDEX_FILE = 'Metadata-analysis/HeadersOutput/metadata_index.json'
 BASE_DIR = 'Battery_Archive_Data'
+DATA_DIR = 'Battery_Archive_Data_NoSubDirs'
 
 def get_subfolders(base_dir):
     return [d for d in os.listdir(base_dir) if os.path.isdir(os.path.join(base_dir, d))]
 
-def find_csv_files(folder_path, keyword):
-    return [f for f in os.listdir(folder_path) if keyword in f and f.endswith('.csv')]
-
 def get_header(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         return f.readline().strip()
 
-def write_description(out_file, folder_name, section_title, files, base_dir):
+def write_description(out_file, section_title, entries):
     out_file.write(f"-- {section_title} --\n")
-    # print(f"-- {section_title} --")
-    for filename in files:
-        file_path = os.path.join(base_dir, folder_name, filename)
-        header = get_header(file_path)
-        out_file.write(f"{filename}:\n{header}\n\n")
-        # print(f"{filename}: {header}")
-
-def record_filename(name_list_file, filename):
-    with open(name_list_file, 'a', encoding='utf-8') as f:
-        f.write(f"{filename}\n")
-
-def process_folder(folder_name, base_dir, description_file, name_list_file):
-    folder_path = os.path.join(base_dir, folder_name)
+    for entry in entries:
+        out_file.write(f"{entry['filename']}:\n{entry['header']}\n\n")
+
+def write_folder_description(description_file, folder_name, entries):
     description_file.write(f"\n=== Folder: {folder_name} ===\n")
-    # print(f"\n=== Folder: {folder_name} ===")
 
     # Timeseries
-    ts_files = find_csv_files(folder_path, 'timeseries')
-    if ts_files:
-        # Registra nomes
-        for fn in ts_files:
-            record_filename(name_list_file, fn)
-        write_description(description_file, folder_name, 'Timeseries files and headers', ts_files, base_dir)
+    ts_entries = [e for e in entries if e['kind'] == 'timeseries']
+    if ts_entries:
+        write_description(description_file, 'Timeseries files and headers', ts_entries)
     else:
         description_file.write("No timeseries files found.\n")
-        # print("No timeseries files found.")
 
     # Cycle data
-    cd_files = find_csv_files(folder_path, 'cycle_data')
-    if cd_files:
-        write_description(description_file, folder_name, 'Cycle_data files and headers', cd_files, base_dir)
+    cd_entries = [e for e in entries if e['kind'] == 'cycle_data']
+    if cd_entries:
+        write_description(description_file, 'Cycle_data files and headers', cd_entries)
     else:
         description_file.write("No cycle_data files found.\n")
-        # print("No cycle_data files found.")
+
+#### Índice incremental do Battery Archive
+# Para cada arquivo (caminho relativo a BASE_DIR) guarda tamanho, mtime, header, componentes do nome e o fitting de NCD1%.
+# Em uma nova execução, apenas arquivos novos ou modificados são relidos e refitados; arquivos removidos saem do índice.
+
+def load_index(index_path):
+    if not os.path.exists(index_path):
+        return {'folders': [], 'files': {}}
+    with open(index_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_index(index, index_path):
+    # Escreve num arquivo temporário e renomeia, para não corromper o índice se a execução for interrompida
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, index_path)
+
+def file_kind(filename):
+    if not filename.endswith('.csv'): return None
+    if 'timeseries' in filename: return 'timeseries'
+    if 'cycle_data' in filename: return 'cycle_data'
+    return None
+
+def update_index(index, base_dir):
+    # Atualiza o índice a partir do conteúdo atual de base_dir. Retorna a lista de arquivos novos ou modificados
+    folders = sorted(get_subfolders(base_dir))
+    files = {}
+    changed = []
+    for folder in tqdm(folders):
+        with os.scandir(os.path.join(base_dir, folder)) as it:
+            for dir_entry in it:
+                kind = file_kind(dir_entry.name)
+                if kind is None or not dir_entry.is_file(): continue
+                key = f"{folder}/{dir_entry.name}"
+                stat = dir_entry.stat()
+                entry = index['files'].get(key)
+
+                if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                    files[key] = entry
+                    continue
+
+                entry = {
+                    'folder': folder,
+                    'filename': dir_entry.name,
+                    'kind': kind,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'header': get_header(dir_entry.path),
+                    'components': filename_record(dir_entry.name) if kind == 'timeseries' else None,
+                    'ncd': None,
+                }
+                files[key] = entry
+                changed.append(key)
+
+    removed = len(set(index['files']) - set(files))
+    index['folders'] = folders
+    index['files'] = dict(sorted(files.items()))
+    print(f"Índice atualizado: {len(changed)} arquivo(s) novo(s) ou modificado(s), {removed} removido(s)")
+    return index, changed
+
+def write_outputs_from_index(index, description_path, list_path):
+    # Reescreve headers_description.txt e a lista de nomes de uma vez, a partir do índice
+    by_folder = {folder: [] for folder in index['folders']}
+    for entry in index['files'].values():
+        by_folder[entry['folder']].append(entry)
+
+    with open(description_path, 'w', encoding='utf-8') as desc:
+        for folder, entries in by_folder.items():
+            write_folder_description(desc, folder, entries)
+
+    with open(list_path, 'w', encoding='utf-8') as names:
+        names.writelines(f"{e['filename']}\n" for e in index['files'].values() if e['kind'] == 'timeseries')
 
 def parse_filename_components(filename):
     # Remove extensão .csv e splita por '_'
@@ -154,9 +220,9 @@ def process_filename(data_dict: dict, components: list, filename: str):
 
     return data_dict
 
-def build_dataframe_from_names(name_list_file):
+def new_data_dict():
     # Cria e define o nome das colunas do DataFrame
-    data_dict = {
+    return {
         'Capacity (Ah)'   : [],
         'Institution'       : [],
         'Cell ID'           : [],
@@ -171,6 +237,14 @@ def build_dataframe_from_names(name_list_file):
         'Full Filename'     : []
     }
 
+def filename_record(filename):
+    # Componentes de um único nome de arquivo, como dicionário {coluna: valor}
+    data_dict = process_filename(new_data_dict(), parse_filename_components(filename), filename)
+    return {column: values[0] for column, values in data_dict.items()}
+
+def build_dataframe_from_names(name_list_file):
+    data_dict = new_data_dict()
+
     with open(name_list_file, 'r', encoding='utf-8') as f:
         for line in f:
             filename = line.strip()
@@ -182,6 +256,12 @@ def build_dataframe_from_names(name_list_file):
     df = df.replace('', 'WARNING')
     return df
 
+def build_dataframe_from_index(index):
+    records = [e['components'] for e in index['files'].values() if e['kind'] == 'timeseries']
+    df = pd.DataFrame(records, columns=list(new_data_dict()))
+    df = df.replace('', 'WARNING')
+    return df
+
 def calculate_currents(df):
     df['Charge Current (A)'] = df['Capacity (Ah)'].astype(float) * df['Charge Rate (C)'].astype(float)
     df['Discharge Current (A)'] = df['Capacity (Ah)'].astype(float) * df['Discharge Rate (C)'].astype(float)
@@ -192,110 +272,178 @@ def calculate_currents(df):
     
     return df
 
-def run_fitting(caminho_arquivo):
+def run_fitting(caminho_arquivo, chunksize=None, interactive=True):
+    # interactive=False: não pausa com input() em arquivos vazios (usado no modo em lote)
     try:
-        df = pd.read_csv(caminho_arquivo)
+        # Capacidade nominal (máxima global)
+        # ---> usar capacidade informada no archive e não a do dataset
+        # nominal_capacity = df['Discharge_Capacity (Ah)'].max()
+        # (aceita caminhos com '\\' ou '/', para rodar também fora do Windows)
+        nominal_capacity = float(caminho_arquivo.replace('\\', '/').split('/')[-1].split('_')[0])
+
+        # Para cada ciclo, extrai a maior capacidade e a temperatura média
+        cycles_capacity, df_grouped = load_cycle_frames(caminho_arquivo, nominal_capacity, chunksize=chunksize)
     except FileNotFoundError:
         print(f"Arquivo de dados não encontrado em: {caminho_arquivo}")
         return None, None
 
-    if df.empty:
+    if df_grouped.empty:
         print(f"Arquivo {caminho_arquivo} está vazio.")
-        input("Pressione Enter para continuar...")
+        if interactive: input("Pressione Enter para continuar...")
         return None, None
-    # Capacidade nominal (máxima global)
-    # ---> usar capacidade informada no archive e não a do dataset
-    # nominal_capacity = df['Discharge_Capacity (Ah)'].max()
-    nominal_capacity = float(caminho_arquivo.split('\\')[-1].split('_')[0])
-    
-    # Para cada ciclo, extrai a maior capacidade
-    cycles_capacity = df.groupby('Cycle_Index')['Discharge_Capacity (Ah)'].max().reset_index()
-    cycles_capacity.columns = ['Cycle_Index', 'Max_Discharge_Capacity']
-    cycles_capacity['SOH_discharge'] = (cycles_capacity['Max_Discharge_Capacity'] / nominal_capacity)
-
-    # Seleciona as features de interesse e agrupa por ciclo
-    df_grouped = df[['Cycle_Index', 'Cell_Temperature (C)']].groupby('Cycle_Index', as_index=False).mean()
 
-    # Adição do SOH calculado
-    df_grouped['SOH_discharge'] = cycles_capacity['SOH_discharge']
-
-    # Define thresholds de SOH de 100% a 1%
-    thresholds = np.arange(1.00, 0.00, -0.01)
-
-    soh = df_grouped['SOH_discharge'].values
-    cycles = df_grouped['Cycle_Index'].values
-
-    # Inverte para que o SOH fique crescente para a interpolação
-    xp = soh[::-1]
-    fp = cycles[::-1]
-    
-    # Filtra thresholds para o intervalo de SOH real dos dados
-    valid_thresholds = thresholds[(thresholds >= xp.min()) & (thresholds <= xp.max())]
-
-    # np.interp estima os ciclos para cada threshold de SOH
-    estimated_cycles = np.interp(valid_thresholds, xp, fp)
-
-    df_estimates = pd.DataFrame({
-        'SOH_threshold': valid_thresholds,
-        'estimated_cycle': estimated_cycles
-    })
-    df_estimates['SOH_threshold'] = df_estimates['SOH_threshold'].astype(float).round(2)
-
-    # Calcula o NCD1% (Number of Cycles Drop para cada 1% de SOH)
-    df_estimates['NCD1%'] = df_estimates['estimated_cycle'].diff()
-
-    # Prepara os dados de NCD1% para o fitting
-    data = df_estimates["NCD1%"].dropna().values
+    # NCD1% (Number of Cycles Drop para cada 1% de SOH) e fitting da distribuição normal
+    # TODO: para cada instituição, fazer um plot do fit para cada instituição, pra ver se a distribuição se encaixa
+    data, mean, std = ncd_fit(df_grouped['SOH_discharge'].values, df_grouped['Cycle_Index'].values)
     
     if len(data) < 2:
         print("Não há dados de NCD1% suficientes para realizar o fitting.")
         return None, None
 
-    # Faz o fitting para encontrar os parâmetros da distribuição normal
-    # TODO: para cada instituição, fazer um plot do fit para cada instituição, pra ver se a distribuição se encaixa
-    mean, std = norm.fit(data)
-
     print(f"Fitting concluído: μ={mean:.2f}, σ={std:.2f}")
     
     return mean, std
 
-def calculate_mean_std(df):
-    # para cada linha de df, pega o nome do arquivo daquela linha
-    for index, row in df.iterrows():
-        filename = row['Full Filename']
-        print(f"Processando arquivo: {filename}")
-        # chama run_fitting passando o caminho do arquivo
-        mean, std = run_fitting(os.path.join('Battery_Archive_Data_NoSubDirs', filename))
-        # adiciona os resultados ao df
+def file_signature(file_path):
+    # (tamanho, mtime) identifica a versão do arquivo usada em um resultado
+    stat = os.stat(file_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def load_checkpoint(checkpoint_path):
+    # Lê os resultados já concluídos: {filename: (assinatura, mean, std)}
+    done = {}
+    if checkpoint_path is None or not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Última linha pode estar incompleta se a execução foi interrompida no meio da escrita
+                continue
+            done[entry['filename']] = (entry['signature'], entry['mean'], entry['std'])
+    return done
+
+def fit_file(filename, data_dir=DATA_DIR):
+    # Executado nos processos do pool: roda o fitting de um arquivo sem interação com o usuário
+    file_path = os.path.join(data_dir, filename)
+    signature = file_signature(file_path) if os.path.exists(file_path) else None
+    mean, std = run_fitting(file_path, interactive=False)
+    return filename, signature, mean, std
+
+def calculate_mean_std(df, workers=1, errors='nan', checkpoint_path=None, data_dir=DATA_DIR):
+    # workers: número de processos (1 = sequencial, no próprio processo)
+    # errors: 'nan' -> exceções viram NaN e o lote continua; 'raise' -> a primeira exceção interrompe o lote
+    # checkpoint_path: arquivo JSON lines com os resultados concluídos; arquivos já presentes (e não modificados) são pulados
+    # Os arquivos cujo fitting lançou exceção ficam em df.attrs['failed'] (NaN no df, mas não são resultado definitivo)
+    if errors not in ('nan', 'raise'):
+        raise ValueError(f"errors deve ser 'nan' ou 'raise', recebido: {errors}")
+
+    done = load_checkpoint(checkpoint_path)
+    results = {}
+    failed = set()
+    pending = []
+    for filename in df['Full Filename'].unique():
+        file_path = os.path.join(data_dir, filename)
+        if filename in done and os.path.exists(file_path) and done[filename][0] == file_signature(file_path):
+            results[filename] = done[filename][1:]
+        else:
+            pending.append(filename)
+    if results:
+        print(f"Retomando: {len(results)} arquivo(s) já processado(s), {len(pending)} pendente(s)")
+
+    checkpoint = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path else None
+
+    def record(filename, signature, mean, std):
         if mean is None or std is None:
             print(f"Erro ao processar o arquivo {filename}. Definindo valores como NaN.")
             mean, std = np.nan, np.nan
-        
-        df.at[index, 'Mean NCD1%'] = mean
-        df.at[index, 'Std NCD1%'] = std
-        
+        results[filename] = (mean, std)
+        if checkpoint is not None and signature is not None:
+            checkpoint.write(json.dumps({'filename': filename, 'signature': signature, 'mean': float(mean), 'std': float(std)}) + '\n')
+            checkpoint.flush()
+
+    def fail(filename, e):
+        if errors == 'raise': raise e
+        # Exceções não vão para o checkpoint: o arquivo é tentado de novo na próxima execução
+        print(f"Erro ao processar o arquivo {filename}: {e}. Definindo valores como NaN.")
+        results[filename] = (np.nan, np.nan)
+        failed.add(filename)
+
+    try:
+        if workers <= 1:
+            for filename in tqdm(pending):
+                print(f"Processando arquivo: {filename}")
+                try:
+                    record(*fit_file(filename, data_dir))
+                except Exception as e:
+                    fail(filename, e)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(fit_file, filename, data_dir): filename for filename in pending}
+                try:
+                    for future in tqdm(as_completed(futures), total=len(futures)):
+                        try:
+                            record(*future.result())
+                        except Exception as e:
+                            fail(futures[future], e)
+                except BaseException:
+                    for future in futures: future.cancel()
+                    raise
+    finally:
+        if checkpoint is not None: checkpoint.close()
+
+    # adiciona os resultados ao df
+    df['Mean NCD1%'] = df['Full Filename'].map(lambda f: results[f][0])
+    df['Std NCD1%'] = df['Full Filename'].map(lambda f: results[f][1])
+    df.attrs['failed'] = failed
     return df
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera o filenames.csv com os metadados e o fitting de NCD1% de cada arquivo timeseries.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Número de processos para o fitting (padrão: número de núcleos)")
+    parser.add_argument('--errors', choices=['nan', 'raise'], default='nan', help="'nan': erros viram NaN e o lote continua; 'raise': interrompe no primeiro erro")
+    parser.add_argument('--checkpoint', default=PATH_CHECKPOINT_FILE, help="Arquivo de checkpoint usado para retomar execuções interrompidas")
+    parser.add_argument('--no-resume', action='store_true', help="Ignora o checkpoint de uma execução interrompida anteriormente")
+    parser.add_argument('--refit', action='store_true', help="Refaz o fitting de todos os arquivos, mesmo os que já têm resultado no índice")
+    return parser.parse_args()
+
 if __name__ == '__main__':
-        
-    # Limpa/Cria arquivos de saída
-    open(PATH_DESCRIPTION_FILE, 'w', encoding='utf-8').close()
-    open(PATH_LIST_FILE, 'w', encoding='utf-8').close()
-    print(f"Arquivos {PATH_DESCRIPTION_FILE} e {PATH_LIST_FILE} limpos ou criados")
-
-    with open(PATH_DESCRIPTION_FILE, 'w', encoding='utf-8') as desc:
-        subfolders = get_subfolders(BASE_DIR)
-        for folder in tqdm(subfolders):
-            process_folder(folder, BASE_DIR, desc, PATH_LIST_FILE)
+    args = parse_args()
+    if args.no_resume and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    # Atualiza o índice: só arquivos novos ou modificados têm o header relido
+    index = load_index(PATH_INDEX_FILE)
+    if args.refit:
+        for entry in index['files'].values(): entry['ncd'] = None
+    index, changed = update_index(index, BASE_DIR)
+    save_index(index, PATH_INDEX_FILE)
+
+    write_outputs_from_index(index, PATH_DESCRIPTION_FILE, PATH_LIST_FILE)
     print(f"Arquivos {PATH_DESCRIPTION_FILE} e {PATH_LIST_FILE} atualizados")
-            
-    df = build_dataframe_from_names(PATH_LIST_FILE)
+
+    df = build_dataframe_from_index(index)
     
     # Adiciona colunas calculadas de corrente
     df = calculate_currents(df)
     
-    # Adiciona colunas mean e std de NCD1%
-    df = calculate_mean_std(df)
+    # Adiciona colunas mean e std de NCD1%: fitting apenas dos arquivos que ainda não têm resultado no índice
+    entries = {e['filename']: e for e in index['files'].values() if e['kind'] == 'timeseries'}
+    pending = df[df['Full Filename'].map(lambda f: entries[f]['ncd'] is None)].copy()
+    if not pending.empty:
+        pending = calculate_mean_std(pending, workers=args.workers, errors=args.errors, checkpoint_path=args.checkpoint)
+        # [nan, nan] só para dados insuficientes; arquivos com exceção continuam sem resultado e são tentados de novo
+        failed = pending.attrs.get('failed', set())
+        for filename, mean, std in zip(pending['Full Filename'], pending['Mean NCD1%'], pending['Std NCD1%']):
+            entries[filename]['ncd'] = None if filename in failed else [float(mean), float(std)]
+        save_index(index, PATH_INDEX_FILE)
+
+    ncd = lambda f, i: entries[f]['ncd'][i] if entries[f]['ncd'] is not None else np.nan
+    df['Mean NCD1%'] = df['Full Filename'].map(lambda f: ncd(f, 0))
+    df['Std NCD1%'] = df['Full Filename'].map(lambda f: ncd(f, 1))
     
     # Organiza a ordem das colunas
     collumn_order = [
@@ -320,4 +468,7 @@ if __name__ == '__main__':
     df.to_csv(PATH_CSV_FILE, index=False, encoding='utf-8')
     
     print(f"Arquivo {PATH_CSV_FILE} atualizado")
+
+    # Execução completa: o checkpoint não é mais necessário
+    if os.path.exists(args.checkpoint): os.remove(args.checkpoint)
     print("Análise concluida com sucesso")
\ No newline at end of file
@@ -5,12 +5,21 @@
 # O estudo do Battery Archive e a documentação da consulta manual está disponível em: https://www.notion.so/Renomea-o-com-capacidades-20884748cd91800b8189c850e3cda6a4
 
 # A Battery Archive original foi renomeada para Original_Battery_Archive_Data, e a nova com as alterações será Battery_Archive_Data
+# Battery_Archive_Data_NoSubDirs tem os mesmos arquivos sem as subpastas (usada por headers.py e pela Home)
+#
+# As duas pastas são "visões" da original: por padrão os arquivos são hardlinks (nenhum byte é copiado); também é possível
+# usar symlinks ou cópias. A sincronização é idempotente: arquivos que já apontam para o original (ou cópias com mesmo
+# tamanho e mtime) são pulados, e só o que mudou é refeito. Não há perguntas interativas; o comportamento vem dos argumentos:
+#   python RenameArchiveCapacity.py [--mode hardlink|symlink|copy] [--no-flat] [--prune] [--workers N] [--dry-run]
 
-import os
+from concurrent.futures import ThreadPoolExecutor
+import argparse
 import shutil
+import os
 
 ORIGINAL_PATH = "Original_Battery_Archive_Data"
 NEW_PATH = "Battery_Archive_Data"
+FLAT_PATH = "Battery_Archive_Data_NoSubDirs"
 
 # Subfolders tanto de ORIGINAL_PATH como de NEW_PATH : Os prefixos de capacidade serão adicionados aos arquivos dentro dessas subpastas
 subfolder_prefixes = {
@@ -25,63 +34,104 @@ subfolder_prefixes = {
     "UL-Purdue": "3.40_"
 }
 
-# Deleta se já existir e cria a pasta de destino
-if os.path.exists(NEW_PATH):
-    print(f"Atenção: A pasta '{NEW_PATH}' já existe. Deseja deletá-la e criar uma nova? (s/n)")
-    resposta = input().strip().lower()
-    if resposta != 's':
-        print("Operação cancelada. A pasta não foi modificada.")
-        exit
-    print(f"Deletando a pasta '{NEW_PATH}'...")
-    shutil.rmtree(NEW_PATH)
-    print(f"A pasta '{NEW_PATH}' foi deletada. Criando nova pasta...")
-os.makedirs(NEW_PATH)
-print(f"Pasta '{NEW_PATH}' criada.")
-
-# Itera sobre as subpastas e seus prefixos definidos
-for subfolder_name, prefix in subfolder_prefixes.items():
-    original_subfolder_path = os.path.join(ORIGINAL_PATH, subfolder_name)
-    new_subfolder_path      = os.path.join(NEW_PATH, subfolder_name)
-
-    print(f"\nProcessando subpasta: '{original_subfolder_path}'")
-    
-    # Verifica se a subpasta original existe
-    if not os.path.exists(original_subfolder_path):
-        print(f"Atenção: Subpasta original '{original_subfolder_path}' não encontrada. Pressione enter para ir para a próxima.")
-        input()
-        continue
+def planned_links(original_path=ORIGINAL_PATH, new_path=NEW_PATH, flat_path=FLAT_PATH):
+    # Lista de (arquivo original, destino) para as duas visões; flat_path=None não gera a visão sem subpastas
+    plan = []
+    for subfolder_name, prefix in subfolder_prefixes.items():
+        original_subfolder_path = os.path.join(original_path, subfolder_name)
+        if not os.path.isdir(original_subfolder_path):
+            print(f"Atenção: Subpasta original '{original_subfolder_path}' não encontrada. Indo para a próxima.")
+            continue
+        for filename in sorted(os.listdir(original_subfolder_path)):
+            original_file_path = os.path.join(original_subfolder_path, filename)
+            if not os.path.isfile(original_file_path): continue
+            # Cria o novo nome do arquivo com o prefixo
+            new_filename = prefix + filename
+            plan.append((original_file_path, os.path.join(new_path, subfolder_name, new_filename)))
+            if flat_path is not None:
+                plan.append((original_file_path, os.path.join(flat_path, new_filename)))
+    return plan
 
-    # Cria a subpasta de destino
-    os.makedirs(new_subfolder_path)
-    print(f"    Subpasta '{new_subfolder_path}' criada.")
+def is_up_to_date(source, target, mode):
+    if not os.path.lexists(target): return False
+    if mode == 'symlink':
+        return os.path.islink(target) and os.path.realpath(target) == os.path.realpath(source)
+    if os.path.islink(target): return False
+    if mode == 'hardlink' and os.path.samefile(source, target): return True
+    # Cópia (ou hardlink que caiu na cópia, ex.: outro disco): atualizada se tiver o mesmo tamanho e data de modificação
+    source_stat, target_stat = os.stat(source), os.stat(target)
+    return source_stat.st_size == target_stat.st_size and source_stat.st_mtime_ns == target_stat.st_mtime_ns
 
-    # Lista todos os arquivos na subpasta original
+def sync_file(source, target, mode='hardlink', dry_run=False):
+    # Cria (ou refaz) o destino apontando para o original. Retorna 'pulado', 'criado', 'copiado' (hardlink impossível) ou 'erro: ...'
     try:
-        # Lista os arquivos na subpasta original (garantindo que se trata de arquivos)
-        files_in_original_subfolder = [f for f in os.listdir(original_subfolder_path) 
-                                       if os.path.isfile(os.path.join(original_subfolder_path, f))]
+        if is_up_to_date(source, target, mode): return 'pulado'
+        if dry_run: return 'criado'
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Cria num arquivo temporário e troca de uma vez: o destino nunca fica pela metade
+        tmp_target = f"{target}.{os.getpid()}.tmp"
+        if os.path.lexists(tmp_target): os.remove(tmp_target)
+        result = 'criado'
+        if mode == 'symlink':
+            os.symlink(os.path.abspath(source), tmp_target)
+        elif mode == 'hardlink':
+            try:
+                os.link(source, tmp_target)
+            except OSError:
+                # Ex.: destino em outro disco/partição, ou sistema de arquivos sem hardlinks
+                shutil.copy2(source, tmp_target)
+                result = 'copiado'
+        else:
+            # shutil.copy2 tenta preservar o máximo de metadados do arquivo original possível
+            shutil.copy2(source, tmp_target)
+        os.replace(tmp_target, target)
+        return result
     except Exception as e:
-        print(f"Erro ao listar arquivos em '{original_subfolder_path}': {e}. Pressione enter para ir para a próxima.")
-        input()
-        continue
+        return f"erro: {e}"
 
-    print(f"    Encontrados {len(files_in_original_subfolder)} arquivos.")
+def prune(plan, folders):
+    # Remove dos destinos os arquivos que não correspondem a nenhum original (ex.: removidos da Battery Archive)
+    expected = {os.path.normpath(target) for _, target in plan}
+    removed = 0
+    for folder in folders:
+        for root, _, files in os.walk(folder):
+            for filename in files:
+                path = os.path.normpath(os.path.join(root, filename))
+                if path not in expected:
+                    os.remove(path)
+                    removed += 1
+    return removed
 
-    # Itera sobre cada arquivo na subpasta original
-    for filename in files_in_original_subfolder:
-        original_file_path = os.path.join(original_subfolder_path, filename)
-        
-        # Cria o novo nome do arquivo com o prefixo
-        new_filename = prefix + filename
-        new_file_path = os.path.join(new_subfolder_path, new_filename)
+def sync(mode='hardlink', flat=True, prune_extra=False, workers=8, dry_run=False):
+    plan = planned_links(flat_path=FLAT_PATH if flat else None)
+    print(f"{len(plan)} arquivo(s) planejado(s) em '{NEW_PATH}'" + (f" e '{FLAT_PATH}'" if flat else "") + f" (modo: {mode})")
 
-        try:
-            # Copia o arquivo para o novo local com o novo nome
-            # shutil.copy2 tenta preservar o máximo de metadados do arquivo original possível
-            shutil.copy2(original_file_path, new_file_path)
-            print(f"    Copiado: '{filename}' para '{new_filename}' em '{new_subfolder_path}'")
-        except Exception as e:
-            print(f"------- Erro ao copiar '{original_file_path}' para '{new_file_path}': {e}. Pressione enter para continuar")
-            input()
+    counts = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for (source, target), result in zip(plan, executor.map(lambda item: sync_file(*item, mode, dry_run), plan)):
+            key = 'erro' if result.startswith('erro') else result
+            counts[key] = counts.get(key, 0) + 1
+            if key == 'erro':
+                print(f"------- Erro ao sincronizar '{source}' para '{target}': {result[len('erro: '):]}")
+            elif key == 'copiado':
+                print(f"    Hardlink impossível, copiado: '{target}'")
+
+    if prune_extra and not dry_run:
+        removed = prune(plan, [NEW_PATH] + ([FLAT_PATH] if flat else []))
+        print(f"    {removed} arquivo(s) sem original removido(s).")
+    print(", ".join(f"{n} {k}" for k, n in sorted(counts.items())) or "Nada a fazer.")
+    return counts
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sincroniza Battery_Archive_Data (com prefixo de capacidade) e Battery_Archive_Data_NoSubDirs a partir da Battery Archive original.")
+    parser.add_argument('--mode', choices=['hardlink', 'symlink', 'copy'], default='hardlink', help="Como criar os arquivos de destino (padrão: hardlink, sem cópia de dados)")
+    parser.add_argument('--no-flat', action='store_true', help=f"Não gera a pasta sem subpastas '{FLAT_PATH}'")
+    parser.add_argument('--prune', action='store_true', help="Remove dos destinos os arquivos que não existem mais na original")
+    parser.add_argument('--workers', type=int, default=8, help="Número de threads (padrão: 8)")
+    parser.add_argument('--dry-run', action='store_true', help="Só mostra o que seria feito")
+    return parser.parse_args()
 
-print(f"\n ---------------- Processamento concluído")
\ No newline at end of file
+if __name__ == '__main__':
+    args = parse_args()
+    sync(mode=args.mode, flat=not args.no_flat, prune_extra=args.prune, workers=args.workers, dry_run=args.dry_run)
+    print(f"\n ---------------- Processamento concluído")
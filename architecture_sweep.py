@@ -0,0 +1,50 @@
+#### Varredura do espaço de arquiteturas da bateria (ns, np, pmin, sp/ps) com fronteira de Pareto
+# Todas as configurações são avaliadas na mesma execução, com números aleatórios comuns: cada replicação sorteia
+# uma única matriz de vidas de células, e cada configuração usa as primeiras ns*np células dela. Assim as diferenças
+# entre configurações refletem a arquitetura, e não o ruído do sorteio, e a varredura custa um sorteio só.
+# A fronteira de Pareto mantém as configurações em que nenhuma outra tem menos (ou igual) células e MTTA maior.
+
+import pandas as pd
+import numpy as np
+from mtta_engine import cell_life_params, pack_failure_times, MAX_DRAWS_PER_BATCH
+
+ARQUITETURAS = ('sp', 'ps')
+QUANTIS = (5, 10, 50)
+# Limite de configurações x replicações de uma varredura: o MTTA de todas fica numa matriz densa (8 bytes cada, ~160 MB)
+MAX_SWEEP_SIMULATIONS = 20_000_000
+
+def configuracoes(ns_valores, np_valores, pmin_valores=(0,), arquiteturas=ARQUITETURAS):
+    # Lista de (arquitetura, ns, np, pmin) válidas (pmin não pode passar de np)
+    return [
+        (arquitetura, ns, n_p, pmin)
+        for arquitetura in arquiteturas for ns in ns_valores for n_p in np_valores for pmin in pmin_valores
+        if pmin <= n_p
+    ]
+
+def sweep_mtta(mu, sigma, configs, sohm=70, replications=1000, seed=None, quantis=QUANTIS):
+    # Retorna um DataFrame com uma linha por configuração: arquitetura, ns, np, pmin, total de células,
+    # MTTA médio e os quantis (P5, P10, ...) do MTTA, em ciclos
+    rng = np.random.default_rng(seed)
+    loc, scale = cell_life_params(mu, sigma, sohm)
+    max_cells = max(ns * n_p for _, ns, n_p, _ in configs)
+    mtta = np.empty((len(configs), replications))
+
+    batch = max(1, MAX_DRAWS_PER_BATCH // max_cells)
+    for start in range(0, replications, batch):
+        stop = min(start + batch, replications)
+        cell_lives = rng.normal(loc, scale, size=(stop - start, max_cells))
+        for i, (arquitetura, ns, n_p, pmin) in enumerate(configs):
+            mtta[i, start:stop] = pack_failure_times(cell_lives[:, :ns * n_p], n_p, ns, pmin, arquitetura)
+
+    resultado = pd.DataFrame(configs, columns=['architecture', 'ns', 'np', 'pmin'])
+    resultado['total_cels'] = resultado['ns'] * resultado['np']
+    resultado['MTTA médio'] = mtta.mean(axis=1)
+    for q, valores in zip(quantis, np.percentile(mtta, quantis, axis=1)):
+        resultado[f'P{q}'] = valores
+    return resultado
+
+def pareto_frontier(resultado, valor='P10', custo='total_cels'):
+    # Configurações não dominadas: para cada custo, a de maior valor, mantida só se superar todas as mais baratas
+    ordenado = resultado.sort_values([custo, valor], ascending=[True, False])
+    melhor_ate_agora = ordenado[valor].cummax().shift(fill_value=-np.inf)
+    return ordenado[ordenado[valor] > melhor_ate_agora].reset_index(drop=True)
@@ -0,0 +1,187 @@
+#### Armazenamento por célula em arrays contíguos, abertos com np.memmap
+# Cada arquivo timeseries vira uma pasta em STORE_DIR com um arquivo binário por coluna (dtype compacto, ver DTYPES),
+# as linhas agrupadas por ciclo (ordem estável: dentro do ciclo, a ordem original é mantida) e uma tabela de offsets:
+# as linhas do ciclo cycles[i] são [offsets[i], offsets[i+1]). Os arrays são abertos com np.memmap (somente leitura),
+# então fatiar um ciclo não copia dados, e vários processos lendo a mesma célula compartilham o cache de páginas do SO.
+# A pasta é identificada pela impressão digital do arquivo (caminho, tamanho, mtime): se o CSV mudar, outra é criada
+# e as pastas das versões anteriores do mesmo arquivo (mesmo 'source' no meta.json) são removidas.
+#
+# Uso: python array_store.py [pasta ou arquivos...] [--workers N]  (padrão: Battery_Archive_Data_NoSubDirs)
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import argparse
+import hashlib
+import shutil
+import json
+import uuid
+import sys
+import os
+from timeseries_cache import read_timeseries, iter_timeseries_chunks
+
+STORE_DIR = os.environ.get('ARRAY_STORE_DIR', '.array_store')
+DEFAULT_CHUNKSIZE = 500_000
+
+# Tempo e capacidade ficam em float64 (precisão do SOH e dos intervalos); as demais grandezas, em float32
+DTYPES = {
+    'Cycle_Index': np.int32,
+    'Test_Time (s)': np.float64,
+    'Current (A)': np.float32,
+    'Voltage (V)': np.float32,
+    'Discharge_Capacity (Ah)': np.float64,
+    'Cell_Temperature (C)': np.float32,
+}
+META_FILE = 'meta.json'
+
+def _file_name(column):
+    return column.replace(' ', '_').replace('(', '').replace(')', '') + '.bin'
+
+def store_path(file_path, store_dir=STORE_DIR):
+    stat = os.stat(file_path)
+    signature = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    digest = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(store_dir, f"{os.path.splitext(os.path.basename(file_path))[0]}-{digest}")
+
+class CellArrays:
+    # Arrays de uma célula: cell['Current (A)'] (memmap), cell.cycles, cell.offsets e cell.cycle(c) (fatias sem cópia)
+    def __init__(self, path):
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.path = path
+        self.n_rows = meta['n_rows']
+        self.columns = {}
+        for column, dtype in meta['dtypes'].items():
+            if self.n_rows == 0:
+                self.columns[column] = np.empty(0, dtype=dtype)
+            else:
+                self.columns[column] = np.memmap(os.path.join(path, _file_name(column)), dtype=dtype, mode='r', shape=(self.n_rows,))
+        self.cycles = np.load(os.path.join(path, 'cycles.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        self._position = {int(c): i for i, c in enumerate(self.cycles)}
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def cycle_slice(self, cycle_index):
+        i = self._position[int(cycle_index)]
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def cycle(self, cycle_index, columns=None):
+        # {coluna: view} com as linhas de um ciclo
+        s = self.cycle_slice(cycle_index)
+        return {column: self.columns[column][s] for column in (columns or self.columns)}
+
+def _write_columns(target, frames, columns):
+    # Escreve os blocos (já agrupados por ciclo) coluna a coluna; retorna (n_rows, cycles, offsets)
+    handles = {column: open(os.path.join(target, _file_name(column)), 'wb') for column in columns}
+    cycles, counts, n_rows = [], [], 0
+    try:
+        for frame in frames:
+            for column in columns:
+                values = frame[column].to_numpy() if column in frame.columns else np.full(len(frame), np.nan)
+                handles[column].write(np.ascontiguousarray(values, dtype=DTYPES[column]).tobytes())
+            # Contagem de linhas por ciclo; um ciclo dividido entre blocos é unido ao anterior
+            block_cycles, block_counts = np.unique(frame['Cycle_Index'].to_numpy(dtype=DTYPES['Cycle_Index']), return_counts=True)
+            if cycles and len(block_cycles) and block_cycles[0] == cycles[-1]:
+                counts[-1] += int(block_counts[0])
+                block_cycles, block_counts = block_cycles[1:], block_counts[1:]
+            cycles.extend(block_cycles.tolist())
+            counts.extend(block_counts.tolist())
+            n_rows += len(frame)
+    finally:
+        for handle in handles.values(): handle.close()
+    offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype(np.int64)
+    return n_rows, np.asarray(cycles, dtype=DTYPES['Cycle_Index']), offsets
+
+def _grouped_chunks(file_path, columns, chunksize):
+    # Blocos na ordem do arquivo; levanta ValueError se os ciclos não estiverem agrupados (Cycle_Index decrescente)
+    last = None
+    for chunk in iter_timeseries_chunks(file_path, columns=columns, chunksize=chunksize):
+        chunk = chunk.dropna(subset=['Cycle_Index'])
+        cycle = chunk['Cycle_Index'].to_numpy()
+        if len(cycle) == 0: continue
+        if np.any(np.diff(cycle) < 0) or (last is not None and cycle[0] < last):
+            raise ValueError("ciclos fora de ordem")
+        last = cycle[-1]
+        yield chunk
+
+def _remove_stale(file_path, path):
+    # Remove as pastas <nome>-* de versões anteriores do mesmo CSV (o 'source' do meta.json identifica o arquivo)
+    store_dir, name = os.path.split(path)
+    prefix = name.rsplit('-', 1)[0] + '-'
+    source = os.path.abspath(file_path)
+    for other in os.listdir(store_dir):
+        other_path = os.path.join(store_dir, other)
+        if not other.startswith(prefix) or other_path == path or other.endswith('.tmp'): continue
+        try:
+            with open(os.path.join(other_path, META_FILE), 'r', encoding='utf-8') as f:
+                if json.load(f).get('source') != source: continue
+        except (OSError, ValueError):
+            continue
+        shutil.rmtree(other_path, ignore_errors=True)
+
+def build_store(file_path, store_dir=STORE_DIR, chunksize=DEFAULT_CHUNKSIZE):
+    # Converte o arquivo (em blocos) e retorna a pasta criada. Se os ciclos não estiverem em ordem, lê o arquivo
+    # inteiro e ordena por Cycle_Index (ordenação estável)
+    path = store_path(file_path, store_dir)
+    columns = list(DTYPES)
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    os.makedirs(tmp_path)
+    try:
+        try:
+            n_rows, cycles, offsets = _write_columns(tmp_path, _grouped_chunks(file_path, columns, chunksize), columns)
+        except ValueError:
+            df = read_timeseries(file_path, columns=columns).dropna(subset=['Cycle_Index']).sort_values('Cycle_Index', kind='stable')
+            n_rows, cycles, offsets = _write_columns(tmp_path, [df], columns)
+        np.save(os.path.join(tmp_path, 'cycles.npy'), cycles)
+        np.save(os.path.join(tmp_path, 'offsets.npy'), offsets)
+        with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'source': os.path.abspath(file_path), 'n_rows': n_rows,
+                       'dtypes': {column: np.dtype(DTYPES[column]).str for column in columns}}, f)
+        try:
+            os.replace(tmp_path, path)
+            _remove_stale(file_path, path)
+        except OSError:
+            # Outro processo já criou a mesma pasta (mesma impressão digital, mesmo conteúdo)
+            shutil.rmtree(tmp_path, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return path
+
+def has_store(file_path, store_dir=STORE_DIR):
+    return os.path.exists(os.path.join(store_path(file_path, store_dir), META_FILE))
+
+def open_cell(file_path, build=True, store_dir=STORE_DIR, chunksize=DEFAULT_CHUNKSIZE):
+    # Abre os arrays da célula (criando-os se build=True e ainda não existirem); None se não existirem e build=False
+    if not has_store(file_path, store_dir):
+        if not build: return None
+        build_store(file_path, store_dir, chunksize)
+    return CellArrays(store_path(file_path, store_dir))
+
+def clear_store(store_dir=STORE_DIR):
+    if os.path.isdir(store_dir): shutil.rmtree(store_dir)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera os arrays por célula (np.memmap) dos arquivos timeseries.")
+    parser.add_argument('paths', nargs='*', default=['Battery_Archive_Data_NoSubDirs'], help="Arquivos ou pastas (padrão: Battery_Archive_Data_NoSubDirs)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Número de processos (padrão: número de núcleos)")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith('.csv') and 'timeseries' in f]
+        else:
+            files.append(path)
+    pending = [f for f in files if not has_store(f)]
+    print(f"{len(files) - len(pending)} arquivo(s) já convertido(s), {len(pending)} a converter.")
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(build_store, f): f for f in pending}
+        for future in as_completed(futures):
+            try:
+                print(f"    Convertido: {future.result()}")
+            except Exception as e:
+                print(f"    Erro ao converter '{futures[future]}': {e}", file=sys.stderr)
@@ -1,69 +1,61 @@
-from scipy.stats import norm
 import streamlit as st
 import pandas as pd
 import numpy as np
 import subprocess
 import math
-
-def rodar_fitting(caminho_arquivo):
+import os
+from cycle_stats import load_cycle_frames
+from ncd import ncd_fit
+from mtta_engine import simulate_mtta, simulate_mtta_adaptive
+from mtta_analytic import mtta_curve
+from progress_channel import CanalProgresso, formatar_progresso
+import simulation_jobs
+import result_cache
+import soh_cleaning
+import instrumentation
+
+EXECUTAVEL_MTTA = "mtta_simulation.exe"
+
+@instrumentation.timed()
+def rodar_fitting(caminho_arquivo, chunksize=None, usar_cache=True, limpar=False, isotonico=False):
+    # chunksize: se informado, lê o arquivo em blocos (streaming), com memória limitada pelo número de ciclos
+    # usar_cache: reaproveita o resultado de um fitting anterior do mesmo arquivo (mesmo tamanho e mtime)
+    # limpar: filtra o SOH antes do fitting (soh_cleaning: perfil da instituição, capacidade nominal do fabricante)
+    # isotonico: calcula o NCD1% a partir do ajuste isotônico (PAVA) do SOH, em vez dos pontos medidos
     st.info(f"Iniciando o fitting para o arquivo: {caminho_arquivo}...")
     
     try:
-        df = pd.read_csv(caminho_arquivo)
+        if usar_cache:
+            perfil = soh_cleaning.PROFILES[soh_cleaning.profile_for(caminho_arquivo)] if limpar else None
+            chave = result_cache.fitting_key(caminho_arquivo, limpeza=perfil, isotonico=isotonico)
+            with instrumentation.span('rodar_fitting.cache'):
+                resultado = result_cache.get(chave)
+            if resultado is not None:
+                mean, std = float(resultado['mean']), float(resultado['std'])
+                st.success(f"Fitting recuperado do cache: μ={mean:.2f}, σ={std:.2f}")
+                return mean, std
+
+        if limpar:
+            # Mesmos filtros dos notebooks SOH-Analysis, seguidos da remoção de outliers do NCD1%
+            with instrumentation.span('rodar_fitting.limpeza_e_fit'):
+                data, mean, std = soh_cleaning.clean_fit(caminho_arquivo, isotonic=isotonico)
+        else:
+            # Para cada ciclo, extrai a maior capacidade e a temperatura média
+            # O SOH usa como capacidade nominal a máxima global
+            cycles_capacity, df_grouped = load_cycle_frames(caminho_arquivo, chunksize=chunksize)
+            # NCD1% (Number of Cycles Drop para cada 1% de SOH) e fitting da distribuição normal
+            with instrumentation.span('rodar_fitting.ncd_fit'):
+                data, mean, std = ncd_fit(df_grouped['SOH_discharge'].values, df_grouped['Cycle_Index'].values, isotonic=isotonico)
     except FileNotFoundError:
         st.error(f"Arquivo de dados não encontrado em: {caminho_arquivo}")
         return None, None
-
-    # Capacidade nominal (máxima global)
-    nominal_capacity = df['Discharge_Capacity (Ah)'].max()
-
-    # Para cada ciclo, extrai a maior capacidade
-    cycles_capacity = df.groupby('Cycle_Index')['Discharge_Capacity (Ah)'].max().reset_index()
-    cycles_capacity.columns = ['Cycle_Index', 'Max_Discharge_Capacity']
-    cycles_capacity['SOH_discharge'] = (cycles_capacity['Max_Discharge_Capacity'] / nominal_capacity)
-
-    # Seleciona as features de interesse e agrupa por ciclo
-    df_grouped = df[['Cycle_Index', 'Cell_Temperature (C)']].groupby('Cycle_Index', as_index=False).mean()
-
-    # Adição do SOH calculado
-    df_grouped['SOH_discharge'] = cycles_capacity['SOH_discharge']
-
-    # Define thresholds de SOH de 100% a 1%
-    thresholds = np.arange(1.00, 0.00, -0.01)
-
-    soh = df_grouped['SOH_discharge'].values
-    cycles = df_grouped['Cycle_Index'].values
-
-    # Inverte para que o SOH fique crescente para a interpolação
-    xp = soh[::-1]
-    fp = cycles[::-1]
-    
-    # Filtra thresholds para o intervalo de SOH real dos dados
-    valid_thresholds = thresholds[(thresholds >= xp.min()) & (thresholds <= xp.max())]
-
-    # np.interp estima os ciclos para cada threshold de SOH
-    estimated_cycles = np.interp(valid_thresholds, xp, fp)
-
-    df_estimates = pd.DataFrame({
-        'SOH_threshold': valid_thresholds,
-        'estimated_cycle': estimated_cycles
-    })
-    df_estimates['SOH_threshold'] = df_estimates['SOH_threshold'].astype(float).round(2)
-
-    # Calcula o NCD1% (Number of Cycles Drop para cada 1% de SOH)
-    df_estimates['NCD1%'] = df_estimates['estimated_cycle'].diff()
-
-    # Prepara os dados de NCD1% para o fitting
-    data = df_estimates["NCD1%"].dropna().values
     
     if len(data) < 2:
         st.warning("Não há dados de NCD1% suficientes para realizar o fitting.")
         return None, None
 
-    # Faz o fitting para encontrar os parâmetros da distribuição normal
-    mean, std = norm.fit(data)
-
     st.success(f"Fitting concluído: μ={mean:.2f}, σ={std:.2f}")
+    if usar_cache: result_cache.put(chave, mean=mean, std=std)
     
     return mean, std
 
@@ -76,6 +68,13 @@ def calcular_arquitetura(v_bat, C_bat, v_cel, C_cel):
     
     return (n_series, n_parallel, total)
 
+def montar_comando_cpp(mu, sigma, num_p, num_s, pmin, sohm, architecture, output_dir):
+    return [
+        EXECUTAVEL_MTTA, "--mu", str(mu), "--sigma", str(sigma), "--np", str(num_p), "--ns", str(num_s), "--pmin", str(pmin),
+        "--sohm", str(sohm), "--architecture", str(architecture), "--output-dir", ("ignoreMe"+str(output_dir))
+    ]
+
+@instrumentation.timed()
 def executar_modelo_cpp(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', output_dir=''):
     # num_p é o número de células em paralelo
     # num_s é o número de células em série
@@ -84,28 +83,28 @@ def executar_modelo_cpp(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architectu
     # architecture é a arquitetura da bateria (sp ou ps)
     
     output_csv_path = output_dir + "simulation_mtta.csv"
-    comando = [
-        "mtta_simulation.exe", "--mu", str(mu), "--sigma", str(sigma), "--np", str(num_p), "--ns", str(num_s), "--pmin", str(pmin),
-        "--sohm", str(sohm), "--architecture", str(architecture), "--output-dir", ("ignoreMe"+str(output_dir))
-    ]
+    comando = montar_comando_cpp(mu, sigma, num_p, num_s, pmin, sohm, architecture, output_dir)
     
     st.info(f"Executando a simulação com Rede de Petri...")
+    barra_progresso = st.progress(0.0, text="Iniciando a simulação...")
     log_placeholder = st.empty()
-    log_placeholder.code("Iniciando a simulação...")
-    log_estatico, linha_progresso_recente = [], ""
+    canal = CanalProgresso()
+
+    def exibir_progresso():
+        # Atualizações limitadas pelo canal (no máximo algumas por segundo) e log com tamanho fixo
+        snapshot = canal.snapshot()
+        barra_progresso.progress(snapshot['percentual'] / 100, text=formatar_progresso(snapshot))
+        if snapshot['log']: log_placeholder.code("\n".join(snapshot['log']))
     
     try:
-        processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', bufsize=1)
-        for linha in iter(processo.stdout.readline, ''):
-            linha_limpa = linha.replace('\r', '')
-            if linha_limpa.strip().startswith('[') and '%' in linha_limpa:
-                linha_progresso_recente = linha_limpa
-            else:
-                log_estatico.append(linha_limpa)
-            output_para_exibir = "".join(log_estatico) + linha_progresso_recente
-            log_placeholder.code(output_para_exibir)
-        processo.wait()
+        with instrumentation.span('executar_modelo_cpp.subprocesso'):
+            processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', bufsize=1)
+            for linha in iter(processo.stdout.readline, ''):
+                canal.feed(linha)
+                if canal.pronto_para_emitir(): exibir_progresso()
+            processo.wait()
         stderr_output = processo.stderr.read()
+        barra_progresso.empty()
         log_placeholder.empty()
         if processo.returncode == 0:
             st.success("Simulação com Rede de Petri executada com sucesso!")
@@ -115,11 +114,136 @@ def executar_modelo_cpp(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architectu
             st.code(f"Código de Erro: {processo.returncode}\n{stderr_output}")
             return output_csv_path # retorna mesmo assim pra caso retorno != 0 não seja um erro fatal
     except FileNotFoundError:
+        barra_progresso.empty()
         log_placeholder.empty()
-        st.warning("⚠️ **Executável não encontrado!** Usando dados simulados.")
-        pd.DataFrame({'index': range(10), 'MTTA': sorted(np.random.normal(loc=1200, scale=80, size=10))}).to_csv(output_csv_path, index=False)
+        st.warning("⚠️ **Executável não encontrado!** Usando o motor de simulação em Python.")
+        mtta = simulate_mtta(mu, sigma, num_p=num_p, num_s=num_s, pmin=pmin, sohm=sohm, architecture=architecture)
+        pd.DataFrame({'SimulationID': np.arange(1, len(mtta) + 1), 'MTTA': mtta}).to_csv(output_csv_path, index=False)
         return output_csv_path
     except Exception as e:
+        barra_progresso.empty()
         log_placeholder.empty()
         st.error(f"Uma exceção inesperada ocorreu: {e}")
         return None
+
+def executavel_disponivel():
+    # O executável é um binário Windows: fora do Windows (ou se ele não existir) não há como rodá-lo
+    return os.name == 'nt' and os.path.exists(EXECUTAVEL_MTTA)
+
+def resolver_motor(motor, precisao=None):
+    # 'analitico' (mtta_analytic) não sorteia replicações, então ignora o modo adaptativo.
+    # O modo adaptativo (precisao informada) só existe no motor em Python: o executável roda um número fixo de replicações
+    if motor == 'analitico': return motor
+    if precisao is not None: return 'python'
+    if motor == 'auto':
+        return 'cpp' if executavel_disponivel() else 'python'
+    return motor
+
+def chave_simulacao(mu, sigma, num_p, num_s, pmin, sohm, architecture, motor, replicacoes, seed, caminho_dataset=None, precisao=None):
+    # Chave do cache de resultados (e da fila de simulações): dataset + todos os parâmetros da simulação
+    return result_cache.mtta_key(mu, sigma, num_p, num_s, pmin, sohm, architecture, motor, replicacoes, seed, caminho_dataset, precisao)
+
+@instrumentation.timed()
+def executar_modelo(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', output_dir='', motor='auto', replicacoes=1000, seed=None, caminho_dataset=None, usar_cache=True, precisao=None):
+    # Executa a simulação e retorna o array de MTTA em memória (ou None em caso de erro)
+    # precisao: se informada, roda em modo adaptativo até a meia-largura relativa do IC (média e quantis) ficar abaixo dela,
+    # com 'replicacoes' como número máximo de replicações
+    # motor: 'cpp' (mtta_simulation.exe), 'python' (mtta_engine, sem processo externo nem CSV), 'auto' (cpp se disponível)
+    # ou 'analitico' (mtta_analytic: 'replicacoes' pontos da CDF exata, sem sorteio)
+    # caminho_dataset: arquivo de origem de mu/sigma, usado (com os parâmetros) na chave do cache de resultados
+    if mu is None or sigma is None:
+        st.error("Não há parâmetros de NCD1% (μ, σ) para executar a simulação.")
+        return None
+    motor = resolver_motor(motor, precisao)
+
+    if usar_cache:
+        chave = chave_simulacao(mu, sigma, num_p, num_s, pmin, sohm, architecture, motor, replicacoes, seed, caminho_dataset, precisao)
+        resultado = result_cache.get(chave)
+        if resultado is not None:
+            st.success("Resultado da simulação recuperado do cache!")
+            return resultado['mtta']
+
+    if motor == 'cpp':
+        resultado_csv = executar_modelo_cpp(mu, sigma, num_p=num_p, num_s=num_s, pmin=pmin, sohm=sohm, architecture=architecture, output_dir=output_dir)
+        if resultado_csv is None or not os.path.exists(resultado_csv):
+            return None
+        with instrumentation.span('executar_modelo.leitura_csv'):
+            mtta = pd.read_csv(resultado_csv)['MTTA'].values
+    elif motor == 'analitico':
+        try:
+            mtta = mtta_curve(mu, sigma, num_p=num_p, num_s=num_s, pmin=pmin, sohm=sohm, architecture=architecture, n=replicacoes)
+        except ValueError as e:
+            st.error(f"Parâmetros inválidos para a simulação: {e}")
+            return None
+    else:
+        st.info("Executando a simulação Monte Carlo em Python...")
+        try:
+            mtta = _simular_python(mu, sigma, num_p, num_s, pmin, sohm, architecture, replicacoes, seed, precisao)
+        except ValueError as e:
+            st.error(f"Parâmetros inválidos para a simulação: {e}")
+            return None
+        st.success("Simulação executada com sucesso!")
+
+    if usar_cache: result_cache.put(chave, mtta=mtta)
+    return mtta
+
+def _simular_python(mu, sigma, num_p, num_s, pmin, sohm, architecture, replicacoes, seed, precisao=None, progress=None):
+    if precisao is None:
+        return simulate_mtta(mu, sigma, num_p=num_p, num_s=num_s, pmin=pmin, sohm=sohm, architecture=architecture, replications=replicacoes, seed=seed, progress=progress)
+    mtta, _ = simulate_mtta_adaptive(mu, sigma, num_p=num_p, num_s=num_s, pmin=pmin, sohm=sohm, architecture=architecture, rel_precision=precisao,
+                                     max_replications=replicacoes, seed=seed, progress=progress)
+    return mtta
+
+@instrumentation.timed('simulacao')
+def _job_simulacao(job, mu, sigma, num_p, num_s, pmin, sohm, architecture, motor, replicacoes, seed, chave, precisao=None):
+    # Roda numa thread do pool de simulation_jobs: não pode usar st.*
+    # O progresso é publicado em job['progresso'] (snapshot do canal), com frequência limitada
+    canal = CanalProgresso()
+    if motor == 'cpp':
+        comando = montar_comando_cpp(mu, sigma, num_p, num_s, pmin, sohm, architecture, job['output_dir'])
+        with instrumentation.span('simulacao.subprocesso'):
+            processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', bufsize=1)
+            job['processo'] = processo
+            if job['cancelado'].is_set(): processo.terminate()
+            for linha in iter(processo.stdout.readline, ''):
+                canal.feed(linha)
+                if canal.pronto_para_emitir(): job['progresso'] = canal.snapshot()
+            processo.wait()
+        if job['cancelado'].is_set():
+            raise simulation_jobs.JobCancelado()
+        if processo.returncode != 0:
+            raise RuntimeError(f"Código de Erro: {processo.returncode}\n{processo.stderr.read()}")
+        with instrumentation.span('simulacao.leitura_csv'):
+            mtta = pd.read_csv(job['output_dir'] + "simulation_mtta.csv")['MTTA'].values
+    else:
+        def progresso(concluidos, total):
+            if job['cancelado'].is_set(): raise simulation_jobs.JobCancelado()
+            canal.atualizar(concluidos, total)
+            if canal.pronto_para_emitir(): job['progresso'] = canal.snapshot()
+        mtta = _simular_python(mu, sigma, num_p, num_s, pmin, sohm, architecture, replicacoes, seed, precisao, progress=progresso)
+
+    job['progresso'] = canal.snapshot()
+    result_cache.put(chave, mtta=mtta)
+    return mtta
+
+def submeter_simulacao(sessao, mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', motor='auto', replicacoes=1000, seed=None, caminho_dataset=None, precisao=None):
+    # Versão não bloqueante de executar_modelo para a interface: coloca a simulação na fila compartilhada
+    # e retorna o id do job (ou None se não houver μ/σ). O estado é consultado com simulation_jobs.status().
+    if mu is None or sigma is None:
+        st.error("Não há parâmetros de NCD1% (μ, σ) para executar a simulação.")
+        return None
+    motor = resolver_motor(motor, precisao)
+    chave = chave_simulacao(mu, sigma, num_p, num_s, pmin, sohm, architecture, motor, replicacoes, seed, caminho_dataset, precisao)
+
+    if motor == 'analitico':
+        # Leva milissegundos: resolvido na hora, sem passar pela fila
+        try:
+            curva = mtta_curve(mu, sigma, num_p=num_p, num_s=num_s, pmin=pmin, sohm=sohm, architecture=architecture, n=replicacoes)
+        except ValueError as e:
+            st.error(f"Parâmetros inválidos para a simulação: {e}")
+            return None
+        return simulation_jobs.submit(chave, None, sessao, resultado=curva)
+
+    em_cache = result_cache.get(chave)
+    funcao = lambda job: _job_simulacao(job, mu, sigma, num_p, num_s, pmin, sohm, architecture, motor, replicacoes, seed, chave, precisao)
+    return simulation_jobs.submit(chave, funcao, sessao, resultado=None if em_cache is None else em_cache['mtta'])
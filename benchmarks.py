@@ -0,0 +1,194 @@
+#### Benchmarks com dados sintéticos (synthetic_data.py)
+# Mede o tempo de cada etapa do projeto em vários tamanhos e grava uma linha JSON por (caso, tamanho) em RESULTS_FILE,
+# com o commit, a versão das bibliotecas e a máquina, para comparar o desempenho entre commits.
+# Casos (por tipo de entrada):
+#   timeseries: rodar_fitting, fitting_core (load_cycle_frames + ncd_fit, sem streamlit), process_data (FittingApp),
+#               manual_weighted_average e chunked_weighted_average (CurrentReview/weighted_averages.py)
+#   catalog:    group_by_features (groups.feature_groups, sem gravar o JSON), build_dataframe_from_names (headers.py)
+#   simulation: simulate_mtta (mtta_engine) e executar_modelo (backend, motor Python, sem cache)
+# Cada caso roda uma vez sem medir (a primeira execução cria o cache colunar/array_store; o tempo dela fica em 'first_s')
+# e depois 'repeats' vezes. Casos cujas dependências não estão instaladas (ex.: streamlit) são gravados como 'skipped'.
+#
+# Uso: python benchmarks.py [--sizes 10k,1M] [--catalog-sizes 1k,100k] [--replications 10k,100k] [--cases a,b] [--repeats 3]
+#      python benchmarks.py --compare <commit base> [<commit novo>]   (padrão do novo: o commit atual)
+
+from datetime import datetime, timezone
+import pandas as pd
+import numpy as np
+import subprocess
+import platform
+import argparse
+import time
+import json
+import sys
+import os
+
+# Scripts das subpastas (Metadata-analysis não é um pacote)
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path += [os.path.join(ROOT, 'Metadata-analysis'), os.path.join(ROOT, 'Metadata-analysis', 'CurrentReview')]
+import synthetic_data
+
+RESULTS_FILE = os.environ.get('BENCH_RESULTS', 'benchmark_results.jsonl')
+DEFAULT_SIZES = {'timeseries': '10k,100k,1M', 'catalog': '1k,100k', 'simulation': '10k,100k'}
+
+# --- Casos: recebem a entrada (caminho, DataFrame ou número de replicações) e retornam a função a ser medida ---
+def _rodar_fitting(path):
+    from backend import rodar_fitting
+    return lambda: rodar_fitting(path, usar_cache=False)
+
+def _fitting_core(path):
+    from cycle_stats import load_cycle_frames
+    from ncd import ncd_fit
+    def run():
+        _, df_grouped = load_cycle_frames(path)
+        return ncd_fit(df_grouped['SOH_discharge'].values, df_grouped['Cycle_Index'].values)
+    return run
+
+def _process_data(path):
+    from FittingApp import process_data
+    return lambda: process_data(path)
+
+def _manual_weighted_average(path):
+    from weighted_averages import manual_weighted_average, COLUMNS
+    from timeseries_cache import read_timeseries
+    df = read_timeseries(path, columns=COLUMNS)
+    return lambda: manual_weighted_average(df)
+
+def _chunked_weighted_average(path):
+    from weighted_averages import chunked_weighted_average
+    return lambda: chunked_weighted_average(path)
+
+def _group_by_features(catalog):
+    from groups import feature_groups, matchingFeatures
+    return lambda: feature_groups(catalog, matchingFeatures)
+
+def _build_dataframe_from_names(names_file):
+    from headers import build_dataframe_from_names
+    return lambda: build_dataframe_from_names(names_file)
+
+def _simulate_mtta(replications):
+    from mtta_engine import simulate_mtta
+    return lambda: simulate_mtta(50.0, 10.0, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', replications=replications, seed=0)
+
+def _executar_modelo(replications):
+    from backend import executar_modelo
+    return lambda: executar_modelo(50.0, 10.0, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', motor='python', replicacoes=replications, seed=0, usar_cache=False)
+
+CASES = {
+    'rodar_fitting': ('timeseries', _rodar_fitting),
+    'fitting_core': ('timeseries', _fitting_core),
+    'process_data': ('timeseries', _process_data),
+    'manual_weighted_average': ('timeseries', _manual_weighted_average),
+    'chunked_weighted_average': ('timeseries', _chunked_weighted_average),
+    'group_by_features': ('catalog', _group_by_features),
+    'build_dataframe_from_names': ('catalog', _build_dataframe_from_names),
+    'simulate_mtta': ('simulation', _simulate_mtta),
+    'executar_modelo': ('simulation', _executar_modelo),
+}
+
+def prepare_input(case, size, data_dir=synthetic_data.OUTPUT_DIR):
+    # Entrada sintética de um caso (gerada uma vez e reaproveitada entre execuções)
+    if case == 'group_by_features':
+        return synthetic_data.synthetic_catalog(size)
+    if case == 'build_dataframe_from_names':
+        path = os.path.join(data_dir, f"names_{size}.txt")
+        return path if os.path.exists(path) else synthetic_data.write_names(path, synthetic_data.synthetic_names(size))
+    if CASES[case][0] == 'timeseries':
+        return synthetic_data.ensure_timeseries(size, out_dir=data_dir)
+    return size
+
+# --- Execução e registro ---
+def git_commit():
+    # (commit, árvore com alterações não commitadas?); (None, None) fora de um repositório git
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=ROOT).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def environment():
+    commit, dirty = git_commit()
+    return {
+        'commit': commit, 'dirty': dirty, 'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+        'machine': platform.node(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+    }
+
+def run_case(case, size, repeats=3):
+    # Retorna o registro (dict) de um caso num tamanho
+    record = {'case': case, 'kind': CASES[case][0], 'size': size, 'repeats': repeats, 'status': 'ok'}
+    try:
+        func = CASES[case][1](prepare_input(case, size))
+    except ImportError as e:
+        return {**record, 'status': 'skipped', 'error': f"{type(e).__name__}: {e}"}
+    try:
+        start = time.perf_counter()
+        func()
+        record['first_s'] = time.perf_counter() - start
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    except Exception as e:
+        return {**record, 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+    record.update({'times_s': times, 'min_s': min(times), 'median_s': float(np.median(times))})
+    return record
+
+def run_suite(cases, sizes, repeats=3, results_file=RESULTS_FILE):
+    # sizes: {tipo: [tamanhos]}; grava cada registro assim que ele termina e retorna a lista de registros
+    base = {'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'), **environment()}
+    records = []
+    for case in cases:
+        for size in sizes[CASES[case][0]]:
+            record = {**base, **run_case(case, size, repeats)}
+            records.append(record)
+            with open(results_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+            timing = f"mediana {record['median_s']:.4f} s" if record['status'] == 'ok' else record['error']
+            print(f"{case:28s} {size:>12,d}  {record['status']:8s} {timing}")
+    return records
+
+def read_results(results_file=RESULTS_FILE):
+    if not os.path.exists(results_file): return pd.DataFrame()
+    with open(results_file, 'r', encoding='utf-8') as f:
+        return pd.DataFrame([json.loads(line) for line in f if line.strip()])
+
+def compare(base_commit, new_commit=None, results_file=RESULTS_FILE):
+    # Mediana mais recente de cada (caso, tamanho) nos dois commits (prefixos aceitos) e a razão novo/base
+    new_commit = new_commit or git_commit()[0]
+    results = read_results(results_file)
+    if results.empty: return pd.DataFrame()
+    results = results[results['status'] == 'ok']
+    latest = lambda commit: (results[results['commit'].str.startswith(commit, na=False)].sort_values('timestamp')
+                             .groupby(['case', 'size'])['median_s'].last())
+    table = pd.concat({'base_s': latest(base_commit), 'new_s': latest(new_commit)}, axis=1).dropna()
+    table['ratio'] = table['new_s'] / table['base_s']
+    return table
+
+def _sizes(text):
+    return [synthetic_data.parse_size(s) for s in text.split(',') if s.strip()]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks do projeto com dados sintéticos.")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES['timeseries'], help="Linhas dos arquivos timeseries (ex.: 10k,1M,50M)")
+    parser.add_argument('--catalog-sizes', default=DEFAULT_SIZES['catalog'], help="Linhas do catálogo / lista de nomes")
+    parser.add_argument('--replications', default=DEFAULT_SIZES['simulation'], help="Replicações das simulações de MTTA")
+    parser.add_argument('--cases', default=','.join(CASES), help="Casos separados por vírgula (padrão: todos)")
+    parser.add_argument('--repeats', type=int, default=3, help="Execuções medidas por caso")
+    parser.add_argument('--results', default=RESULTS_FILE, help=f"Arquivo JSONL de resultados (padrão: {RESULTS_FILE})")
+    parser.add_argument('--compare', nargs='+', metavar='COMMIT', help="Compara os resultados de dois commits em vez de rodar")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.compare:
+        table = compare(*args.compare[:2], results_file=args.results)
+        print(table.to_string() if not table.empty else "Nenhum resultado em comum entre os commits.")
+    else:
+        cases = [c.strip() for c in args.cases.split(',') if c.strip()]
+        unknown = [c for c in cases if c not in CASES]
+        if unknown: sys.exit(f"Casos desconhecidos: {', '.join(unknown)}. Disponíveis: {', '.join(CASES)}")
+        sizes = {'timeseries': _sizes(args.sizes), 'catalog': _sizes(args.catalog_sizes), 'simulation': _sizes(args.replications)}
+        run_suite(cases, sizes, args.repeats, args.results)
+        print(f"\nResultados adicionados a '{args.results}'")
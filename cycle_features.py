@@ -0,0 +1,181 @@
+#### Extrator de atributos por ciclo (feature store)
+# Lê cada arquivo timeseries uma única vez (em blocos) e gera uma tabela com uma linha por ciclo:
+# capacidades máximas, energia de descarga, temperatura média/máxima, duração do ciclo e correntes médias ponderadas pelo tempo.
+# Os acumuladores de cada ciclo são combináveis entre blocos (máximos, somas e contagens), então a memória depende só do
+# número de ciclos. Como em weighted_averages.py, cada linha é ponderada pelo tempo até a PRÓXIMA medição; a última linha
+# de cada bloco é levada para o bloco seguinte. Arquivos fora da ordem cronológica são lidos inteiros e ordenados.
+#
+# Uso: python cycle_features.py [--workers N] [--chunksize N] [--rebuild]
+# gera FEATURE_STORE para todo o acervo, reprocessando só os arquivos novos ou modificados (tamanho/mtime).
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+import pandas as pd
+import numpy as np
+import argparse
+import os
+from timeseries_cache import read_timeseries, iter_timeseries_chunks, pq
+from cycle_stats import DEFAULT_CHUNKSIZE, _build_frames
+
+FEATURE_COLUMNS = ['Cycle_Index', 'Test_Time (s)', 'Current (A)', 'Voltage (V)', 'Charge_Capacity (Ah)', 'Discharge_Capacity (Ah)', 'Cell_Temperature (C)']
+DATA_DIR = 'Battery_Archive_Data_NoSubDirs'
+# Com pyarrow a tabela é salva em Parquet; sem ele, em CSV (mesmo nome, extensão .csv)
+FEATURE_STORE = 'Metadata-analysis/HeadersOutput/cycle_features.parquet'
+
+# Acumuladores por ciclo e como combiná-los entre blocos
+_AGGREGATIONS = {
+    'max_discharge_capacity': 'max', 'max_charge_capacity': 'max', 'discharge_energy_wh': 'sum',
+    'temperature_sum': 'sum', 'temperature_count': 'sum', 'max_temperature': 'max',
+    'start_time': 'min', 'end_time': 'max',
+    'charge_acc': 'sum', 'charge_time_s': 'sum', 'discharge_acc': 'sum', 'discharge_time_s': 'sum', 'samples': 'sum',
+}
+
+def _partial(df, interval):
+    # Acumuladores por ciclo de um bloco; interval[i] = tempo até a próxima medição da linha i
+    current = df['Current (A)'].to_numpy(dtype=float)
+    charge, discharge = current > 0, current < 0
+    rows = pd.DataFrame({
+        'Cycle_Index': df['Cycle_Index'].to_numpy(),
+        'max_discharge_capacity': df['Discharge_Capacity (Ah)'].to_numpy(dtype=float),
+        'max_charge_capacity': df['Charge_Capacity (Ah)'].to_numpy(dtype=float),
+        'discharge_energy_wh': np.where(discharge, df['Voltage (V)'].to_numpy(dtype=float) * -current * interval / 3600, 0.0),
+        'temperature_sum': df['Cell_Temperature (C)'].fillna(0).to_numpy(dtype=float),
+        'temperature_count': df['Cell_Temperature (C)'].notna().to_numpy(dtype=int),
+        'max_temperature': df['Cell_Temperature (C)'].to_numpy(dtype=float),
+        'start_time': df['Test_Time (s)'].to_numpy(dtype=float),
+        'end_time': df['Test_Time (s)'].to_numpy(dtype=float),
+        'charge_acc': np.where(charge, current * interval, 0.0),
+        'charge_time_s': np.where(charge, interval, 0.0),
+        'discharge_acc': np.where(discharge, current * interval, 0.0),
+        'discharge_time_s': np.where(discharge, interval, 0.0),
+        'samples': 1,
+    })
+    return rows.groupby('Cycle_Index').agg(_AGGREGATIONS)
+
+def _accumulate(chunks):
+    # Retorna os acumuladores por ciclo, ou None se algum bloco sair da ordem cronológica
+    acc, carry = None, None
+    for chunk in chunks:
+        for column in FEATURE_COLUMNS:
+            if column not in chunk.columns: chunk = chunk.assign(**{column: np.nan})
+        if carry is not None: chunk = pd.concat([carry, chunk], ignore_index=True)
+        interval = np.diff(chunk['Test_Time (s)'].to_numpy(dtype=float))
+        if np.any(interval < 0): return None
+        # A última linha só recebe peso quando o próximo bloco chegar
+        carry = chunk.iloc[-1:]
+        if len(chunk) < 2: continue
+        partial = _partial(chunk.iloc[:-1], interval)
+        acc = partial if acc is None else pd.concat([acc, partial]).groupby(level=0).agg(_AGGREGATIONS)
+    if carry is not None:
+        # Última linha do arquivo: peso zero
+        partial = _partial(carry, np.zeros(1))
+        acc = partial if acc is None else pd.concat([acc, partial]).groupby(level=0).agg(_AGGREGATIONS)
+    return acc
+
+def extract_cycle_features(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    # Tabela com uma linha por ciclo (em ordem crescente de Cycle_Index)
+    acc = _accumulate(iter_timeseries_chunks(file_path, columns=FEATURE_COLUMNS, chunksize=chunksize))
+    if acc is None:
+        df = read_timeseries(file_path, columns=FEATURE_COLUMNS).sort_values('Test_Time (s)', kind='stable')
+        acc = _accumulate([df])
+    if acc is None or acc.empty:
+        return pd.DataFrame(columns=['Cycle_Index'])
+
+    acc = acc.sort_index()
+    features = pd.DataFrame({
+        'Max_Discharge_Capacity (Ah)': acc['max_discharge_capacity'],
+        'Max_Charge_Capacity (Ah)': acc['max_charge_capacity'],
+        'Discharge_Energy (Wh)': acc['discharge_energy_wh'],
+        'Mean_Temperature (C)': acc['temperature_sum'] / acc['temperature_count'].where(acc['temperature_count'] > 0),
+        'Max_Temperature (C)': acc['max_temperature'],
+        'Cycle_Duration (s)': acc['end_time'] - acc['start_time'],
+        'Charge_Weighted_Current (A)': acc['charge_acc'] / acc['charge_time_s'].where(acc['charge_time_s'] > 0),
+        'Discharge_Weighted_Current (A)': acc['discharge_acc'] / acc['discharge_time_s'].where(acc['discharge_time_s'] > 0),
+        'Charge_Time (s)': acc['charge_time_s'],
+        'Discharge_Time (s)': acc['discharge_time_s'],
+        'Samples': acc['samples'],
+    })
+    return features.reset_index()
+
+# --- Consumidores: derivam da tabela os mesmos resultados que antes exigiam ler o timeseries ---
+def soh_frames(features, nominal_capacity=None):
+    # Mesmos (cycles_capacity, df_grouped) de cycle_stats.load_cycle_frames, a partir das linhas de um arquivo
+    features = features.set_index('Cycle_Index').sort_index()
+    return _build_frames(features['Max_Discharge_Capacity (Ah)'], features['Mean_Temperature (C)'], nominal_capacity)
+
+def file_weighted_currents(features):
+    # Médias de corrente ponderadas pelo tempo do arquivo inteiro (como em weighted_averages.py)
+    charge_time, discharge_time = features['Charge_Time (s)'].sum(), features['Discharge_Time (s)'].sum()
+    charge = (features['Charge_Weighted_Current (A)'].fillna(0) * features['Charge_Time (s)']).sum()
+    discharge = (features['Discharge_Weighted_Current (A)'].fillna(0) * features['Discharge_Time (s)']).sum()
+    return {
+        'charge_weighted_average': charge / charge_time if charge_time > 0 else np.nan,
+        'discharge_weighted_average': discharge / discharge_time if discharge_time > 0 else np.nan,
+    }
+
+# --- Feature store do acervo ---
+def store_path(path=FEATURE_STORE):
+    return path if pq is not None else os.path.splitext(path)[0] + '.csv'
+
+def read_feature_store(path=FEATURE_STORE):
+    path = store_path(path)
+    if not os.path.exists(path): return pd.DataFrame()
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+
+def write_feature_store(store, path=FEATURE_STORE):
+    path = store_path(path)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if path.endswith('.parquet'): store.to_parquet(tmp_path, index=False)
+    else: store.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _file_features(file_path, chunksize):
+    stat = os.stat(file_path)
+    features = extract_cycle_features(file_path, chunksize)
+    features.insert(0, 'Full Filename', os.path.basename(file_path))
+    features['File_Size'], features['File_Mtime_ns'] = stat.st_size, stat.st_mtime_ns
+    return features
+
+def build_feature_store(data_dir=DATA_DIR, path=FEATURE_STORE, workers=None, chunksize=DEFAULT_CHUNKSIZE, rebuild=False):
+    # Atualiza a tabela do acervo: arquivos novos ou modificados são extraídos em paralelo; removidos saem da tabela
+    store = pd.DataFrame() if rebuild else read_feature_store(path)
+    files = {f: os.stat(os.path.join(data_dir, f)) for f in os.listdir(data_dir) if f.endswith('.csv') and 'timeseries' in f}
+
+    known = {}
+    if not store.empty:
+        store = store[store['Full Filename'].isin(files)]
+        known = store.groupby('Full Filename')[['File_Size', 'File_Mtime_ns']].first().apply(tuple, axis=1).to_dict()
+    pending = [f for f, stat in files.items() if known.get(f) != (stat.st_size, stat.st_mtime_ns)]
+    if not store.empty:
+        store = store[~store['Full Filename'].isin(pending)]
+
+    parts, errors = [store], []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_file_features, os.path.join(data_dir, f), chunksize): f for f in pending}
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            try:
+                parts.append(future.result())
+            except Exception as e:
+                errors.append((futures[future], f"{type(e).__name__}: {e}"))
+
+    store = pd.concat([p for p in parts if not p.empty], ignore_index=True) if any(not p.empty for p in parts) else pd.DataFrame()
+    if not store.empty:
+        store = store.sort_values(['Full Filename', 'Cycle_Index'], kind='stable').reset_index(drop=True)
+    write_feature_store(store, path)
+    return store, errors
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera a tabela de atributos por ciclo (feature store) de todos os arquivos timeseries.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Número de processos (padrão: número de núcleos)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Linhas por bloco na leitura de cada arquivo")
+    parser.add_argument('--rebuild', action='store_true', help="Reprocessa todos os arquivos, ignorando a tabela existente")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    store, errors = build_feature_store(workers=args.workers, chunksize=args.chunksize, rebuild=args.rebuild)
+    for file_name, error in errors:
+        print(f"    Erro ao processar o arquivo '{file_name}': {error}. Pulando.")
+    print(f"\nProcessamento concluído: {store['Full Filename'].nunique() if not store.empty else 0} arquivo(s), "
+          f"{len(store)} ciclo(s) salvos em '{store_path()}'")
@@ -0,0 +1,104 @@
+#### Agregados por ciclo usados no cálculo do SOH
+# Gera os mesmos DataFrames 'cycles_capacity' e 'df_grouped' do rodar_fitting, seja com o arquivo inteiro em memória,
+# seja em modo streaming: o arquivo é lido em blocos e os agregados (máximo da capacidade e soma/contagem da temperatura)
+# são acumulados por ciclo. No streaming, a memória depende apenas do número de ciclos, e não do tamanho do arquivo.
+# Se a célula já estiver no array_store (np.memmap), os agregados saem direto dos arrays, por ciclo, sem copiar o arquivo.
+
+import pandas as pd
+import numpy as np
+import os
+from timeseries_cache import read_timeseries, iter_timeseries_chunks
+import array_store
+import instrumentation
+
+CYCLE_COLUMNS = ['Cycle_Index', 'Discharge_Capacity (Ah)', 'Cell_Temperature (C)']
+
+# Arquivos maiores que isso são processados em streaming automaticamente
+STREAMING_MIN_BYTES = int(os.environ.get('STREAMING_MIN_BYTES', 1 * 1024**3))
+DEFAULT_CHUNKSIZE = 500_000
+
+def _build_frames(max_capacity, mean_temperature, nominal_capacity=None):
+    # max_capacity e mean_temperature são Series indexadas por Cycle_Index (em ordem crescente)
+    # Se nominal_capacity não for informada, usa a capacidade máxima global
+    if nominal_capacity is None:
+        nominal_capacity = max_capacity.max()
+
+    cycles_capacity = max_capacity.reset_index()
+    cycles_capacity.columns = ['Cycle_Index', 'Max_Discharge_Capacity']
+    cycles_capacity['SOH_discharge'] = (cycles_capacity['Max_Discharge_Capacity'] / nominal_capacity)
+
+    df_grouped = mean_temperature.reset_index()
+    df_grouped.columns = ['Cycle_Index', 'Cell_Temperature (C)']
+    df_grouped['SOH_discharge'] = cycles_capacity['SOH_discharge']
+
+    return cycles_capacity, df_grouped
+
+def cycle_frames(df, nominal_capacity=None):
+    # Versão em memória: df deve conter as colunas de CYCLE_COLUMNS
+    max_capacity = df.groupby('Cycle_Index')['Discharge_Capacity (Ah)'].max()
+    mean_temperature = df.groupby('Cycle_Index')['Cell_Temperature (C)'].mean()
+    return _build_frames(max_capacity, mean_temperature, nominal_capacity)
+
+def cycle_frames_chunked(file_path, nominal_capacity=None, chunksize=DEFAULT_CHUNKSIZE):
+    # Versão streaming: acumula por ciclo o máximo da capacidade e a soma/contagem da temperatura, bloco a bloco
+    acc = None
+    for chunk in iter_timeseries_chunks(file_path, columns=CYCLE_COLUMNS, chunksize=chunksize):
+        partial = chunk.groupby('Cycle_Index').agg(
+            capacity_max=('Discharge_Capacity (Ah)', 'max'),
+            temperature_sum=('Cell_Temperature (C)', 'sum'),
+            temperature_count=('Cell_Temperature (C)', 'count'),
+        )
+        if acc is None:
+            acc = partial
+        else:
+            # Um mesmo ciclo pode estar dividido entre dois blocos: combina os parciais
+            acc = pd.concat([acc, partial]).groupby(level=0).agg(
+                {'capacity_max': 'max', 'temperature_sum': 'sum', 'temperature_count': 'sum'}
+            )
+
+    if acc is None:
+        empty = pd.Series(dtype=float, index=pd.Index([], name='Cycle_Index'))
+        return _build_frames(empty, empty, nominal_capacity)
+
+    acc = acc.sort_index()
+    # Ciclos sem nenhuma temperatura válida ficam com NaN, como no groupby().mean()
+    mean_temperature = acc['temperature_sum'] / acc['temperature_count'].where(acc['temperature_count'] > 0)
+    return _build_frames(acc['capacity_max'], mean_temperature, nominal_capacity)
+
+def cycle_frames_from_store(cell, nominal_capacity=None):
+    # Versão com os arrays de array_store: reduções por ciclo (np.*.reduceat) sobre os offsets, sem DataFrame intermediário
+    index = pd.Index(np.asarray(cell.cycles), name='Cycle_Index')
+    if cell.n_rows == 0:
+        empty = pd.Series(dtype=float, index=index)
+        return _build_frames(empty, empty, nominal_capacity)
+    starts = np.asarray(cell.offsets[:-1])
+    capacity = cell['Discharge_Capacity (Ah)']
+    temperature = cell['Cell_Temperature (C)']
+    valid = ~np.isnan(temperature)
+    # fmax ignora NaN, como o groupby().max()
+    max_capacity = np.fmax.reduceat(capacity, starts)
+    temperature_sum = np.add.reduceat(np.where(valid, temperature, 0), starts, dtype=np.float64)
+    temperature_count = np.add.reduceat(valid, starts, dtype=np.int64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_temperature = np.where(temperature_count > 0, temperature_sum / temperature_count, np.nan)
+    return _build_frames(pd.Series(max_capacity, index=index), pd.Series(mean_temperature, index=index), nominal_capacity)
+
+def load_cycle_frames(file_path, nominal_capacity=None, chunksize=None, use_store=None):
+    # Escolhe entre o array_store, a leitura completa e o streaming.
+    # use_store: None usa o array_store se a célula já estiver nele; True cria se necessário; False nunca usa.
+    # Com chunksize informado, ou para arquivos maiores que STREAMING_MIN_BYTES, usa o streaming
+    if use_store is not False:
+        cell = array_store.open_cell(file_path, build=bool(use_store))
+        if cell is not None:
+            with instrumentation.span('cycle_stats.array_store'):
+                return cycle_frames_from_store(cell, nominal_capacity)
+    if chunksize is None and os.path.getsize(file_path) >= STREAMING_MIN_BYTES:
+        chunksize = DEFAULT_CHUNKSIZE
+    if chunksize is not None:
+        with instrumentation.span('cycle_stats.streaming', chunksize=chunksize):
+            return cycle_frames_chunked(file_path, nominal_capacity, chunksize)
+
+    with instrumentation.span('cycle_stats.leitura_csv'):
+        df = read_timeseries(file_path, columns=CYCLE_COLUMNS)
+    with instrumentation.span('cycle_stats.groupby'):
+        return cycle_frames(df, nominal_capacity)
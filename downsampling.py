@@ -0,0 +1,37 @@
+#### Redução de pontos para gráficos: Largest-Triangle-Three-Buckets (LTTB)
+# Mantém o primeiro e o último ponto e divide o restante em (n_out - 2) faixas; de cada faixa escolhe o ponto que forma
+# o maior triângulo com o ponto escolhido na faixa anterior e a média da faixa seguinte. Preserva picos e a forma da
+# curva com um número fixo de pontos, então o custo de desenhar não depende do tamanho do arquivo.
+# x deve estar em ordem crescente (ex.: tempo).
+
+import numpy as np
+
+def lttb_indices(x, y, n_out):
+    # Índices (crescentes) dos pontos escolhidos
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    bordas = np.linspace(1, n - 1, n_out - 1).astype(int)   # faixas [bordas[i], bordas[i+1]) entre o 1º e o último ponto
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    anterior = 0
+    for i in range(n_out - 2):
+        inicio, fim = bordas[i], bordas[i + 1]
+        # Média da próxima faixa (na última, o último ponto)
+        if i + 2 < len(bordas):
+            proximo_inicio, proximo_fim = bordas[i + 1], bordas[i + 2]
+            x_medio, y_medio = x[proximo_inicio:proximo_fim].mean(), y[proximo_inicio:proximo_fim].mean()
+        else:
+            x_medio, y_medio = x[-1], y[-1]
+        # Dobro da área do triângulo (anterior, candidato, média da próxima faixa)
+        areas = np.abs((x[anterior] - x_medio) * (y[inicio:fim] - y[anterior]) - (x[anterior] - x[inicio:fim]) * (y_medio - y[anterior]))
+        anterior = inicio + int(np.nanargmax(areas)) if not np.all(np.isnan(areas)) else inicio
+        indices[i + 1] = anterior
+    return indices
+
+def lttb(x, y, n_out):
+    # Retorna (x, y) reduzidos a no máximo n_out pontos
+    indices = lttb_indices(x, y, n_out)
+    return np.asarray(x)[indices], np.asarray(y)[indices]
@@ -0,0 +1,48 @@
+#### Índice categórico para os filtros em cascata da Home
+# Construído uma vez por versão do catálogo (filenames.csv): cada coluna de filtro vira códigos categóricos
+# (pd.factorize) e um bitmap (bits empacotados, np.packbits) por valor.
+# - Uma seleção em cascata é a interseção (AND) dos bitmaps dos valores escolhidos;
+# - as opções de uma coluna são os valores cujo bitmap tem interseção não vazia com a máscara atual;
+# - o DataFrame filtrado só é materializado no final (linhas()).
+# Valores ausentes (NaN) não viram opção, como antes (df[coluna] == NaN nunca selecionava linhas).
+
+import pandas as pd
+import numpy as np
+
+class IndiceFiltros:
+    def __init__(self, df, colunas):
+        self.df = df.reset_index(drop=True)
+        self.n = len(self.df)
+        self.valores = {}   # coluna -> array com os valores distintos (ordem de primeira aparição)
+        self.posicoes = {}  # coluna -> {valor: índice em valores}
+        self.bitmaps = {}   # coluna -> (n_valores, n_bytes) uint8
+        for coluna in colunas:
+            codigos, valores = pd.factorize(self.df[coluna])
+            presenca = np.zeros((len(valores), self.n), dtype=bool)
+            validos = codigos >= 0
+            presenca[codigos[validos], np.flatnonzero(validos)] = True
+            self.valores[coluna] = valores
+            self.posicoes[coluna] = {valor: i for i, valor in enumerate(valores.tolist())}
+            self.bitmaps[coluna] = np.packbits(presenca, axis=1)
+
+    def todos(self):
+        # Máscara com todas as linhas do catálogo
+        return np.packbits(np.ones(self.n, dtype=bool))
+
+    def opcoes(self, coluna, mascara):
+        # Valores da coluna presentes nas linhas da máscara
+        presentes = np.bitwise_and(self.bitmaps[coluna], mascara).any(axis=1)
+        return self.valores[coluna][presentes].tolist()
+
+    def filtrar(self, coluna, valor, mascara):
+        # Interseção da máscara com as linhas em que coluna == valor
+        i = self.posicoes[coluna].get(valor)
+        if i is None: return np.zeros_like(mascara)
+        return np.bitwise_and(self.bitmaps[coluna][i], mascara)
+
+    def contar(self, mascara):
+        return int(np.unpackbits(mascara, count=self.n).sum())
+
+    def linhas(self, mascara):
+        # DataFrame com as linhas da máscara
+        return self.df.iloc[np.flatnonzero(np.unpackbits(mascara, count=self.n))]
@@ -0,0 +1,89 @@
+#### Modo frota: fitting de NCD1% + simulação de MTTA para todas as células selecionadas
+# Cada célula (arquivo de dados) é analisada em um processo separado (ProcessPoolExecutor), então o tempo total
+# escala com o número de núcleos, e não com o número de células. Os resultados são entregues à medida que terminam.
+# As funções que rodam nos processos não importam o streamlit; a simulação usa o motor em Python (mtta_engine),
+# e fitting e MTTA compartilham o cache de resultados (result_cache) com o modo de célula única.
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import numpy as np
+import os
+from cycle_stats import load_cycle_frames
+from ncd import ncd_fit
+from mtta_engine import simulate_mtta
+import result_cache
+import soh_cleaning
+
+MAX_WORKERS = int(os.environ.get('FLEET_WORKERS', os.cpu_count() or 1))
+
+def fitting_celula(caminho_arquivo, usar_cache=True, limpar=False, isotonico=False):
+    # (μ, σ) do NCD1% de um arquivo; levanta ValueError se não houver dados suficientes
+    # limpar / isotonico: mesmas opções do rodar_fitting (soh_cleaning e ajuste isotônico do SOH)
+    perfil = soh_cleaning.PROFILES[soh_cleaning.profile_for(caminho_arquivo)] if limpar else None
+    chave = result_cache.fitting_key(caminho_arquivo, limpeza=perfil, isotonico=isotonico)
+    if usar_cache:
+        resultado = result_cache.get(chave)
+        if resultado is not None:
+            return float(resultado['mean']), float(resultado['std'])
+    if limpar:
+        data, mean, std = soh_cleaning.clean_fit(caminho_arquivo, isotonic=isotonico)
+    else:
+        _, df_grouped = load_cycle_frames(caminho_arquivo)
+        data, mean, std = ncd_fit(df_grouped['SOH_discharge'].values, df_grouped['Cycle_Index'].values, isotonic=isotonico)
+    if len(data) < 2:
+        raise ValueError("Não há dados de NCD1% suficientes para realizar o fitting.")
+    if usar_cache: result_cache.put(chave, mean=mean, std=std)
+    return mean, std
+
+def analisar_celula(caminho_arquivo, num_p=1, num_s=1, pmin=0, sohm=95, architecture='sp', replicacoes=1000, seed=None, usar_cache=True, limpar=False, isotonico=False):
+    # Roda num processo do pool. Retorna {'arquivo', 'mu', 'sigma', 'mtta', 'erro'}; erros não interrompem a frota
+    resultado = {'arquivo': caminho_arquivo, 'mu': None, 'sigma': None, 'mtta': None, 'erro': None}
+    try:
+        mu, sigma = fitting_celula(caminho_arquivo, usar_cache, limpar, isotonico)
+        resultado['mu'], resultado['sigma'] = mu, sigma
+        chave = result_cache.mtta_key(mu, sigma, num_p, num_s, pmin, sohm, architecture, 'python', replicacoes, seed, caminho_arquivo)
+        em_cache = result_cache.get(chave) if usar_cache else None
+        if em_cache is not None:
+            resultado['mtta'] = em_cache['mtta']
+        else:
+            resultado['mtta'] = simulate_mtta(mu, sigma, num_p=num_p, num_s=num_s, pmin=pmin, sohm=sohm, architecture=architecture, replications=replicacoes, seed=seed)
+            if usar_cache: result_cache.put(chave, mtta=resultado['mtta'])
+    except Exception as e:
+        resultado['erro'] = f"{type(e).__name__}: {e}"
+    return resultado
+
+def analisar_frota(caminhos, workers=None, seed=None, **parametros):
+    # Gerador: produz o resultado de cada célula assim que ele fica pronto (ordem de término, não de entrada).
+    # Com seed, cada célula usa seed + i (i = posição em caminhos), então o resultado não depende da ordem de término.
+    # Se o consumidor parar de iterar (ex.: rerun do Streamlit), as células ainda não iniciadas são canceladas.
+    workers = min(workers or MAX_WORKERS, max(len(caminhos), 1))
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [
+            executor.submit(analisar_celula, caminho, seed=None if seed is None else seed + i, **parametros)
+            for i, caminho in enumerate(caminhos)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def resumo_frota(resultados):
+    # Uma linha por célula: parâmetros do fitting e a dispersão do MTTA (média, desvio e percentis)
+    linhas = []
+    for r in resultados:
+        linha = {'Arquivo': os.path.basename(r['arquivo']), 'μ': r['mu'], 'σ': r['sigma']}
+        if r['mtta'] is not None:
+            mtta = np.asarray(r['mtta'])
+            p5, p50, p95 = np.percentile(mtta, [5, 50, 95])
+            linha.update({'MTTA médio': mtta.mean(), 'Desvio MTTA': mtta.std(ddof=1) if len(mtta) > 1 else 0.0,
+                          'P5': p5, 'P50': p50, 'P95': p95})
+        linha['Erro'] = r['erro']
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+def mtta_combinado(resultados):
+    # Distribuição combinada: todas as replicações de todas as células, ordenadas, com a probabilidade acumulada
+    mtta = np.sort(np.concatenate([np.asarray(r['mtta']) for r in resultados if r['mtta'] is not None] or [np.empty(0)]))
+    n = len(mtta)
+    return pd.DataFrame({'MTTA': mtta, 'prob_acumulada': np.arange(n) / (n - 1) if n > 1 else np.ones(n)})
@@ -0,0 +1,170 @@
+#### Medição de tempo e pico de memória por etapa (spans), ligada pela variável de ambiente PERF_SPANS=1
+# Uso:  with instrumentation.span('rodar_fitting.ncd_fit'): ...     ou     @instrumentation.timed('plot_overview')
+# Desligado (padrão), span() devolve um contexto vazio e não mede nada. Ligado, cada span registra a duração e o pico de
+# memória alocada pelo Python/NumPy durante a etapa (tracemalloc, acima do que já estava alocado na entrada), aninhando
+# os spans (o campo 'parent' guarda o span de fora). Cada registro é gravado como uma linha JSON em SPANS_FILE,
+# com o processo e a sessão, para agregar várias sessões (summarize), e guardado na lista da execução atual
+# (por thread: cada execução do script do Streamlit roda na sua), exibida no painel da barra lateral (sidebar_panel).
+# O tracemalloc deixa as alocações mais lentas: os tempos medidos com ele ligado são um pouco maiores que os reais.
+# O pico do tracemalloc é do processo inteiro: se spans de outra thread (outra sessão, jobs em segundo plano) estiverem
+# abertos ao mesmo tempo, o pico mistura as duas e o span é gravado com peak_mb = None.
+# O painel lê apenas as últimas SIDEBAR_MAX_SPANS linhas de SPANS_FILE (o arquivo só cresce).
+
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+import pandas as pd
+import tracemalloc
+import functools
+import threading
+import time
+import json
+import os
+
+ENABLED = os.environ.get('PERF_SPANS', '').lower() in ('1', 'true', 'yes', 'on')
+SPANS_FILE = os.environ.get('PERF_SPANS_FILE', 'perf_spans.jsonl')
+SIDEBAR_MAX_SPANS = 10_000
+
+_local = threading.local()
+_file_lock = threading.Lock()
+# Spans abertos em todas as threads e o lock que protege eles e o pico do tracemalloc
+_open_entries = []
+_peak_lock = threading.Lock()
+
+def _stack():
+    if not hasattr(_local, 'stack'): _local.stack = []
+    return _local.stack
+
+def begin_run(session=None):
+    # Início de uma execução (ex.: cada rerun da página): limpa os spans exibidos e define a sessão dos próximos registros
+    _local.records = []
+    _local.session = session
+
+def run_records():
+    # Spans da execução atual nesta thread, na ordem em que terminaram
+    return list(getattr(_local, 'records', []))
+
+def _write(record):
+    with _file_lock:
+        with open(SPANS_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+
+@contextmanager
+def _measure(name, attrs):
+    stack = _stack()
+    thread = threading.get_ident()
+    with _peak_lock:
+        if not tracemalloc.is_tracing(): tracemalloc.start()
+        # O pico do span de fora até aqui é guardado antes de zerar o pico para este span
+        current, peak = tracemalloc.get_traced_memory()
+        if stack: stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        entry = {'name': name, 'start_memory': current, 'peak': current, 'thread': thread, 'shared': False}
+        # Outra thread com span aberto: o pico deixa de ser só desta etapa, para os spans abertos e para este
+        if any(e['thread'] != thread for e in _open_entries):
+            entry['shared'] = True
+            for e in _open_entries: e['shared'] = True
+        _open_entries.append(entry)
+    stack.append(entry)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield entry
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        stack.pop()
+        with _peak_lock:
+            peak = max(entry['peak'], tracemalloc.get_traced_memory()[1])
+            if stack: stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            _open_entries.remove(entry)
+        record = {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='milliseconds'), 'name': name,
+            'parent': stack[-1]['name'] if stack else None, 'duration_ms': duration * 1000,
+            'peak_mb': None if entry['shared'] else (peak - entry['start_memory']) / 1024**2, 'pid': os.getpid(),
+            'session': getattr(_local, 'session', None), 'error': error, **attrs,
+        }
+        if hasattr(_local, 'records'): _local.records.append(record)
+        try:
+            _write(record)
+        except OSError:
+            pass  # falha ao gravar o arquivo não interrompe a análise
+
+def span(name, **attrs):
+    # Contexto que mede uma etapa; attrs (valores simples) vão junto no registro, ex.: span('leitura', arquivo=caminho)
+    return _measure(name, attrs) if ENABLED else nullcontext()
+
+def timed(name=None):
+    # Decorador: mede cada chamada da função como um span (nome padrão: o nome da função)
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _tail_lines(path, n, block_size=1 << 16):
+    # Últimas n linhas do arquivo, lendo blocos a partir do fim
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= n:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.splitlines()
+    # Sem chegar ao início do arquivo, a primeira linha lida pode estar cortada
+    if position > 0: lines = lines[1:]
+    return [line.decode('utf-8') for line in lines[-n:]]
+
+def read_spans(path=SPANS_FILE, last=None):
+    # last: lê apenas os últimos 'last' registros (None = o arquivo inteiro)
+    if not os.path.exists(path): return pd.DataFrame()
+    if last is not None:
+        lines = _tail_lines(path, last)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    records = []
+    for line in lines:
+        if not line.strip(): continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue  # linha sendo escrita por outra sessão
+    return pd.DataFrame(records)
+
+def summarize(spans):
+    # Agregado por etapa (de uma ou várias sessões): chamadas, tempo médio/p95/total e pico de memória médio/máximo
+    if spans.empty: return pd.DataFrame()
+    spans = spans.assign(peak_mb=pd.to_numeric(spans['peak_mb']))  # None (pico compartilhado) vira NaN
+    grouped = spans.groupby('name')
+    return pd.DataFrame({
+        'chamadas': grouped.size(),
+        'média (ms)': grouped['duration_ms'].mean(),
+        'p95 (ms)': grouped['duration_ms'].quantile(0.95),
+        'total (s)': grouped['duration_ms'].sum() / 1000,
+        'pico médio (MB)': grouped['peak_mb'].mean(),
+        'pico máx. (MB)': grouped['peak_mb'].max(),
+    }).sort_values('total (s)', ascending=False)
+
+def sidebar_panel():
+    # Painel recolhível na barra lateral: spans desta execução e o agregado de todas as sessões em SPANS_FILE.
+    # Chamar no fim do script, depois das etapas medidas
+    if not ENABLED: return
+    import streamlit as st
+    with st.sidebar.expander("⏱️ Tempo e memória por etapa"):
+        records = run_records()
+        if records:
+            recentes = pd.DataFrame(records)[['name', 'parent', 'duration_ms', 'peak_mb']]
+            st.dataframe(recentes.rename(columns={'name': 'Etapa', 'parent': 'Dentro de', 'duration_ms': 'Tempo (ms)', 'peak_mb': 'Pico (MB)'}),
+                         hide_index=True)
+        else:
+            st.caption("Nenhuma etapa medida nesta execução.")
+        st.caption(f"Todas as sessões (últimos {SIDEBAR_MAX_SPANS:,} registros de {SPANS_FILE}):")
+        st.dataframe(summarize(read_spans(last=SIDEBAR_MAX_SPANS)))
@@ -0,0 +1,69 @@
+#### Solução semi-analítica do MTTA (sem sorteios), para o mesmo modelo de mtta_engine
+# A vida de cada célula é Normal(L, S), com L = (100 - sohm)*mu e S = sqrt(100 - sohm)*sigma, e F(t) = Φ((t - L) / S).
+# - Série de n elementos: falha na primeira falha -> 1 - (1 - G)^n.
+# - Grupo paralelo de n elementos que falha na (k+1)-ésima falha (k = n - max(pmin, 1), como em _parallel_failure_index):
+#   P(ao menos k+1 falhas até t) = I_G(k+1, n-k) (função beta incompleta regularizada, estatística de ordem).
+# - 'sp': ramos (série de num_s células) em paralelo; 'ps': módulos (paralelo de num_p células) em série.
+# A média vem de E[T] = a + ∫_a^b (1 - F_pack(t)) dt numa grade que cobre a massa de probabilidade,
+# e os quantis, da inversão da CDF por interpolação. Também serve de oráculo para validar o Monte Carlo.
+
+from scipy.special import betainc, ndtr
+import numpy as np
+from mtta_engine import cell_life_params, _parallel_failure_index, simulate_mtta
+
+GRID_POINTS = 8001
+# Largura da grade em desvios-padrão da célula, para cada lado da média
+GRID_SPAN = 12.0
+
+def _series(cdf, n):
+    with np.errstate(divide='ignore'):
+        return -np.expm1(n * np.log1p(-np.clip(cdf, 0.0, 1.0)))
+
+def _parallel(cdf, n, k):
+    return betainc(k + 1, n - k, np.clip(cdf, 0.0, 1.0))
+
+def pack_failure_cdf(t, mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp'):
+    # P(tempo de falha da bateria <= t), para t escalar ou array
+    loc, scale = cell_life_params(mu, sigma, sohm)
+    k = _parallel_failure_index(num_p, pmin)
+    t = np.asarray(t, dtype=float)
+    # sigma = 0: todas as células falham exatamente em loc (CDF degrau)
+    cell = (t >= loc).astype(float) if scale == 0 else ndtr((t - loc) / scale)
+    if architecture == 'sp':
+        return _parallel(_series(cell, num_s), num_p, k)
+    if architecture == 'ps':
+        return _series(_parallel(cell, num_p, k), num_s)
+    raise ValueError(f"architecture deve ser 'sp' ou 'ps', recebido: {architecture}")
+
+def mtta_distribution(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', points=GRID_POINTS):
+    # Retorna (t, cdf): a CDF do tempo de falha da bateria numa grade de 'points' pontos
+    loc, scale = cell_life_params(mu, sigma, sohm)
+    t = np.linspace(loc - GRID_SPAN * scale, loc + GRID_SPAN * scale, points)
+    return t, pack_failure_cdf(t, mu, sigma, num_p, num_s, pmin, sohm, architecture)
+
+def mtta_mean(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', points=GRID_POINTS):
+    t, cdf = mtta_distribution(mu, sigma, num_p, num_s, pmin, sohm, architecture, points)
+    sobrevivencia = 1.0 - cdf
+    return float(t[0] + np.sum((sobrevivencia[1:] + sobrevivencia[:-1]) * np.diff(t)) / 2)
+
+def mtta_quantiles(probabilities, mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', points=GRID_POINTS):
+    # Tempo de falha em que a CDF atinge cada probabilidade
+    t, cdf = mtta_distribution(mu, sigma, num_p, num_s, pmin, sohm, architecture, points)
+    cdf = np.maximum.accumulate(cdf)
+    inicio = np.searchsorted(cdf, 0.0, side='right') - 1   # descarta a cauda plana em 0 (interp exige x crescente)
+    fim = np.searchsorted(cdf, 1.0, side='left') + 1
+    return np.interp(probabilities, cdf[max(inicio, 0):fim], t[max(inicio, 0):fim])
+
+def mtta_curve(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', n=1000):
+    # Curva no mesmo formato das replicações do Monte Carlo: n tempos de falha nas posições (i + 0.5) / n,
+    # prontos para o gráfico de probabilidade acumulada da Home
+    return mtta_quantiles((np.arange(n) + 0.5) / n, mu, sigma, num_p, num_s, pmin, sohm, architecture)
+
+def validate_monte_carlo(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', replications=100_000, seed=None):
+    # Compara o Monte Carlo com a solução analítica: {'ks': distância de Kolmogorov-Smirnov, 'erro_media': erro relativo da média}
+    mtta = np.sort(simulate_mtta(mu, sigma, num_p, num_s, pmin, sohm, architecture, replications, seed))
+    cdf = pack_failure_cdf(mtta, mu, sigma, num_p, num_s, pmin, sohm, architecture)
+    n = len(mtta)
+    ks = max(np.max(np.arange(1, n + 1) / n - cdf), np.max(cdf - np.arange(n) / n))
+    media = mtta_mean(mu, sigma, num_p, num_s, pmin, sohm, architecture)
+    return {'ks': float(ks), 'erro_media': float(abs(mtta.mean() - media) / abs(media))}
@@ -0,0 +1,118 @@
+#### Simulação Monte Carlo do MTTA (Mean Time To Failure) em Python/NumPy
+# Alternativa ao mtta_simulation.exe: todas as replicações são simuladas de uma vez, com matrizes NumPy.
+#
+# Modelo (o mesmo parametrizado pelo executável):
+# - A cada 1% de SOH perdido, a célula gasta NCD1% ~ Normal(mu, sigma) ciclos.
+#   A célula falha ao atingir 'sohm' (%), ou seja, após (100 - sohm) quedas de 1%.
+#   Como a soma de normais i.i.d. é normal, a vida da célula é Normal((100 - sohm)*mu, sqrt(100 - sohm)*sigma).
+# - 'sp' (série-paralelo): num_p ramos em paralelo, cada um com num_s células em série.
+#   Um ramo falha na primeira falha de suas células.
+# - 'ps' (paralelo-série): num_s módulos em série, cada um com num_p células em paralelo.
+#   A bateria falha na primeira falha de um módulo.
+# - pmin: número mínimo de elementos em paralelo (ramos no 'sp', células por módulo no 'ps') que o sistema suporta.
+#   O grupo paralelo falha quando restam menos de max(pmin, 1) elementos funcionando.
+#
+# simulate_mtta_adaptive roda as replicações em blocos e para quando o intervalo de confiança da média e dos quantis
+# pedidos fica estreito o bastante (largura relativa), em vez de usar um número fixo de replicações. A precisão é
+# avaliada em checkpoints geométricos (batch_size, 2x, 4x, ... replicações), então o custo total fica proporcional ao
+# número de replicações feitas, e não quadrático.
+# IC da média: normal (z * s / sqrt(n)); IC dos quantis: por estatísticas de ordem (não paramétrico).
+
+from statistics import NormalDist
+import numpy as np
+
+QUANTILES = (0.05, 0.5)
+
+# Limite de números aleatórios gerados por bloco de replicações (controla o pico de memória)
+MAX_DRAWS_PER_BATCH = 20_000_000
+
+def cell_life_params(mu, sigma, sohm):
+    # Média e desvio-padrão da vida (em ciclos) de uma célula até atingir sohm
+    drops = 100 - sohm
+    if drops <= 0:
+        raise ValueError(f"sohm deve ser menor que 100, recebido: {sohm}")
+    return drops * mu, np.sqrt(drops) * sigma
+
+def _parallel_failure_index(num_p, pmin):
+    # Índice (0-based) da falha, entre os elementos em paralelo ordenados, que derruba o grupo
+    minimum = max(pmin, 1)
+    if minimum > num_p:
+        raise ValueError(f"pmin ({pmin}) não pode ser maior que o número de elementos em paralelo ({num_p})")
+    return num_p - minimum
+
+def pack_failure_times(cell_lives, num_p, num_s, pmin, architecture):
+    # cell_lives: (R, num_s * num_p) vidas das células de R baterias. Retorna o tempo de falha de cada bateria
+    k = _parallel_failure_index(num_p, pmin)
+    if architecture == 'sp':
+        strings = cell_lives.reshape(-1, num_p, num_s).min(axis=2)
+        return np.partition(strings, k, axis=1)[:, k]
+    if architecture == 'ps':
+        modules = np.partition(cell_lives.reshape(-1, num_s, num_p), k, axis=2)[:, :, k]
+        return modules.min(axis=1)
+    raise ValueError(f"architecture deve ser 'sp' ou 'ps', recebido: {architecture}")
+
+def simulate_mtta(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', replications=1000, seed=None, progress=None):
+    # Retorna um array com o tempo de falha (em ciclos) de cada replicação, na ordem da simulação
+    # progress: callable opcional progress(concluidas, total), chamado após cada bloco de replicações
+    rng = np.random.default_rng(seed)
+    loc, scale = cell_life_params(mu, sigma, sohm)
+    n_cells = num_s * num_p
+    _parallel_failure_index(num_p, pmin)
+
+    batch = max(1, MAX_DRAWS_PER_BATCH // n_cells)
+    mtta = np.empty(replications)
+    for start in range(0, replications, batch):
+        stop = min(start + batch, replications)
+        cell_lives = rng.normal(loc, scale, size=(stop - start, n_cells))
+        mtta[start:stop] = pack_failure_times(cell_lives, num_p, num_s, pmin, architecture)
+        if progress is not None: progress(stop, replications)
+    return mtta
+
+def mtta_precision(mtta, quantiles=QUANTILES, confidence=0.95):
+    # Meia-largura relativa do IC da média e de cada quantil: {'mean': ..., 'P5': ..., 'P50': ...}
+    # (ex.: 0.01 = ±1% do valor estimado). inf se ainda não houver amostras suficientes
+    mtta = np.sort(np.asarray(mtta))
+    n = len(mtta)
+    if n < 2: return {'mean': np.inf, **{f"P{q * 100:g}": np.inf for q in quantiles}}
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    mean = mtta.mean()
+    precision = {'mean': float(z * mtta.std(ddof=1) / np.sqrt(n) / abs(mean)) if mean else np.inf}
+    for q in quantiles:
+        half = z * np.sqrt(n * q * (1 - q))
+        lower, upper = int(np.floor(n * q - half)), int(np.ceil(n * q + half))
+        estimate = np.quantile(mtta, q)
+        if lower < 0 or upper > n - 1 or not estimate:
+            precision[f"P{q * 100:g}"] = np.inf
+        else:
+            precision[f"P{q * 100:g}"] = float((mtta[upper] - mtta[lower]) / 2 / abs(estimate))
+    return precision
+
+def simulate_mtta_adaptive(mu, sigma, num_p=4, num_s=2, pmin=0, sohm=70, architecture='sp', rel_precision=0.01,
+                           quantiles=QUANTILES, confidence=0.95, batch_size=500, max_replications=50_000, seed=None, progress=None):
+    # Simula até todas as meias-larguras relativas ficarem <= rel_precision (ou max_replications), verificando a precisão
+    # com batch_size replicações e depois a cada vez que o total dobra.
+    # Retorna (mtta, info), com info = {'replications', 'converged', 'precision'}.
+    # progress: callable opcional progress(concluidas, max_replications), chamado após cada bloco
+    rng = np.random.default_rng(seed)
+    loc, scale = cell_life_params(mu, sigma, sohm)
+    n_cells = num_s * num_p
+    _parallel_failure_index(num_p, pmin)
+
+    batch = max(1, MAX_DRAWS_PER_BATCH // n_cells)
+    mtta = np.empty(max_replications)
+    done = 0
+    checkpoint = min(max(batch_size, 1), max_replications)
+    precision = mtta_precision(mtta[:0], quantiles, confidence)
+    while done < max_replications:
+        stop = min(done + batch, checkpoint)
+        mtta[done:stop] = pack_failure_times(rng.normal(loc, scale, size=(stop - done, n_cells)), num_p, num_s, pmin, architecture)
+        done = stop
+        if progress is not None: progress(done, max_replications)
+        if done < checkpoint: continue
+        precision = mtta_precision(mtta[:done], quantiles, confidence)
+        if max(precision.values()) <= rel_precision:
+            break
+        checkpoint = min(2 * done, max_replications)
+    mtta = mtta[:done]
+    converged = bool(max(precision.values()) <= rel_precision)
+    return mtta, {'replications': len(mtta), 'converged': converged, 'precision': precision}
@@ -0,0 +1,181 @@
+#### Cálculo do NCD1% (Number of Cycles Drop a cada 1% de SOH) para várias células de uma vez
+# Substitui o pipeline SOH -> thresholds -> np.interp -> diff() -> norm.fit que era repetido em cada script.
+# As curvas de SOH de N células são empilhadas numa matriz (N, L) preenchida com NaN, e a interpolação é feita
+# com uma busca binária vetorizada sobre todas as células e thresholds ao mesmo tempo (curvas não monótonas, em que
+# a busca binária não equivale ao np.interp, passam pelo np.interp, linha a linha).
+# Com isotonic=True, o SOH de cada célula é antes ajustado por regressão isotônica (PAVA, não crescente no ciclo):
+# a curva vira uma lista de nós (ciclo médio, SOH médio de cada bloco) estritamente decrescente, então a inversão
+# SOH -> ciclo é bem definida e o NCD nunca é negativo. Os nós são calculados uma vez e servem para qualquer 'step'.
+
+import numpy as np
+
+def soh_thresholds(step=0.01):
+    # Thresholds de SOH de 100% a 'step' (mesma geração usada desde o rodar_fitting original)
+    return np.arange(1.00, 0.00, -step)
+
+def pad_curves(curves, fill=np.nan):
+    # Empilha uma lista de arrays 1D de tamanhos diferentes numa matriz (N, L_max) e retorna também os tamanhos
+    lengths = np.array([len(c) for c in curves], dtype=np.int64)
+    padded = np.full((len(curves), lengths.max() if len(curves) else 0), fill, dtype=float)
+    for i, c in enumerate(curves):
+        padded[i, :lengths[i]] = c
+    return padded, lengths
+
+def _batched_interp(x, xp, fp, lengths):
+    # Equivalente a np.interp(x[i], xp[i, :lengths[i]], fp[i, :lengths[i]]) para cada linha i.
+    # x: (N, T); xp, fp: (N, L) com xp crescente em cada linha (mesma premissa do np.interp)
+    n_cells, n_x = x.shape
+    rows = np.arange(n_cells)[:, None]
+
+    # Busca binária vetorizada: k = quantidade de pontos de xp <= x (searchsorted com side='right')
+    lo = np.zeros((n_cells, n_x), dtype=np.int64)
+    hi = np.broadcast_to(lengths[:, None], (n_cells, n_x)).copy()
+    while np.any(lo < hi):
+        active = lo < hi
+        mid = (lo + hi) // 2
+        go_right = xp[rows, np.minimum(mid, xp.shape[1] - 1)] <= x
+        lo = np.where(active & go_right, mid + 1, lo)
+        hi = np.where(active & ~go_right, mid, hi)
+
+    last = np.maximum(lengths[:, None] - 1, 0)
+    j = np.clip(lo - 1, 0, np.maximum(last - 1, 0))
+    x0, x1 = xp[rows, j], xp[rows, np.minimum(j + 1, last)]
+    y0, y1 = fp[rows, j], fp[rows, np.minimum(j + 1, last)]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (y1 - y0) / (x1 - x0)
+        y = slope * (x - x0) + y0
+    # Acerto exato num ponto de xp (inclui pontos repetidos) retorna o fp correspondente
+    y = np.where(x == x0, y0, y)
+    y = np.where(x == x1, y1, y)
+    # Fora do intervalo: valores das extremidades, como no np.interp
+    y = np.where(lo == 0, fp[:, :1], y)
+    y = np.where(lo >= lengths[:, None], fp[rows, last], y)
+    return y
+
+def ncd_batch(soh_curves, cycle_curves, step=0.01, isotonic=False):
+    # soh_curves / cycle_curves: listas com um array por célula (SOH e Cycle_Index por ciclo, na ordem dos ciclos)
+    # isotonic: inverte o ajuste isotônico do SOH (isotonic_knots) em vez dos pontos medidos
+    # Retorna:
+    #   ncd   -> matriz (N, T-1) com o NCD de cada célula; NaN fora do intervalo de SOH da célula
+    #   mu    -> média (ajuste normal) do NCD de cada célula; NaN se a célula tiver menos de 2 valores
+    #   sigma -> desvio-padrão (ajuste normal, igual ao norm.fit) de cada célula
+    if isotonic:
+        return ncd_from_knots(isotonic_knots(soh_curves, cycle_curves), step)
+
+    soh, lengths = pad_curves(soh_curves)
+    cycles, _ = pad_curves(cycle_curves)
+    thresholds = soh_thresholds(step)
+    n_cells = len(lengths)
+
+    if n_cells == 0 or soh.shape[1] == 0:
+        return np.full((n_cells, len(thresholds) - 1), np.nan), np.full(n_cells, np.nan), np.full(n_cells, np.nan)
+
+    # Inverte cada curva (apenas a parte válida) para que o SOH fique crescente para a interpolação
+    idx = lengths[:, None] - 1 - np.arange(soh.shape[1])[None, :]
+    valid_pos = idx >= 0
+    rows = np.arange(n_cells)[:, None]
+    xp = np.where(valid_pos, soh[rows, np.maximum(idx, 0)], np.inf)
+    fp = np.where(valid_pos, cycles[rows, np.maximum(idx, 0)], np.nan)
+
+    # Filtra thresholds para o intervalo de SOH real de cada célula.
+    # Como no np.min/np.max originais, uma curva com NaN não tem thresholds válidos
+    has_nan = np.isnan(xp).any(axis=1)
+    soh_min = np.min(xp, axis=1)
+    soh_max = np.max(np.where(valid_pos, xp, -np.inf), axis=1)
+    valid = (thresholds[None, :] >= soh_min[:, None]) & (thresholds[None, :] <= soh_max[:, None]) & ~has_nan[:, None] & (lengths[:, None] > 0)
+
+    x = np.broadcast_to(thresholds, (n_cells, len(thresholds)))
+    estimated_cycles = _batched_interp(x, xp, fp, lengths)
+
+    estimated_cycles = np.where(valid, estimated_cycles, np.nan)
+
+    # A busca binária só reproduz o np.interp com xp em ordem crescente. Curvas reais (com ruído) não são monótonas:
+    # essas linhas são interpoladas com o próprio np.interp, como no rodar_fitting original. Com xp fora de ordem o
+    # resultado do np.interp depende de quais pontos são consultados (a busca parte do ponto anterior), então ele
+    # recebe exatamente os thresholds válidos da célula
+    with np.errstate(invalid='ignore'):  # inf - inf no preenchimento
+        increasing = np.all((np.diff(xp, axis=1) >= 0) | ~valid_pos[:, 1:], axis=1)
+    for i in np.flatnonzero(~increasing & valid.any(axis=1)):
+        estimated_cycles[i, valid[i]] = np.interp(thresholds[valid[i]], xp[i, :lengths[i]], fp[i, :lengths[i]])
+
+    # NCD1%: diferença entre os ciclos estimados de thresholds consecutivos
+    return _ncd_fit(np.diff(estimated_cycles, axis=1))
+
+def _ncd_fit(ncd):
+    # Ajuste normal (MLE, como o norm.fit): média e desvio-padrão populacional de cada linha com 2 ou mais valores
+    n_cells = len(ncd)
+    counts = np.sum(~np.isnan(ncd), axis=1)
+    enough = counts >= 2
+    mu = np.full(n_cells, np.nan)
+    sigma = np.full(n_cells, np.nan)
+    if np.any(enough):
+        mu[enough] = np.nanmean(ncd[enough], axis=1)
+        sigma[enough] = np.nanstd(ncd[enough], axis=1)
+
+    return ncd, mu, sigma
+
+def pava_decreasing(y, weights=None):
+    # Regressão isotônica não crescente (pool adjacent violators), O(n). Retorna (valores ajustados por ponto, blocos),
+    # blocos = lista de (início, fim) com fim exclusivo; cada bloco tem o valor médio (ponderado) dos seus pontos
+    y = np.asarray(y, dtype=float)
+    w = np.ones(len(y)) if weights is None else np.asarray(weights, dtype=float)
+    sums, totals, starts = [], [], []
+    for i, (value, weight) in enumerate(zip(y.tolist(), w.tolist())):
+        sums.append(value * weight); totals.append(weight); starts.append(i)
+        # Junta blocos enquanto o anterior não for estritamente maior (empates também viram um bloco só)
+        while len(sums) > 1 and sums[-2] * totals[-1] <= sums[-1] * totals[-2]:
+            s, t = sums.pop(), totals.pop()
+            starts.pop()
+            sums[-1] += s; totals[-1] += t
+    ends = starts[1:] + [len(y)]
+    fitted = np.repeat(np.array(sums) / np.array(totals), np.diff(starts + [len(y)])) if len(y) else np.empty(0)
+    return fitted, list(zip(starts, ends))
+
+def isotonic_fit(soh, cycles):
+    # Nós do ajuste isotônico de uma célula: (ciclos, SOH), com ciclos crescentes e SOH estritamente decrescente.
+    # Cada nó é um bloco do PAVA: ciclo médio e SOH médio dos pontos do bloco. Pontos com NaN são ignorados
+    soh, cycles = np.asarray(soh, dtype=float), np.asarray(cycles, dtype=float)
+    valid = ~(np.isnan(soh) | np.isnan(cycles))
+    soh, cycles = soh[valid], cycles[valid]
+    order = np.argsort(cycles, kind='stable')
+    soh, cycles = soh[order], cycles[order]
+    fitted, blocks = pava_decreasing(soh)
+    starts = np.array([start for start, _ in blocks], dtype=np.int64)
+    counts = np.diff(np.append(starts, len(soh)))
+    knot_cycles = np.add.reduceat(cycles, starts) / counts if len(soh) else np.empty(0)
+    return knot_cycles, fitted[starts] if len(soh) else np.empty(0)
+
+def isotonic_knots(soh_curves, cycle_curves):
+    # Ajusta todas as células e empilha os nós já invertidos para a busca: (xp = SOH crescente, fp = ciclos, lengths)
+    knots = [isotonic_fit(soh, cycles) for soh, cycles in zip(soh_curves, cycle_curves)]
+    xp, lengths = pad_curves([knot_soh[::-1] for _, knot_soh in knots], fill=np.inf)
+    fp, _ = pad_curves([knot_cycles[::-1] for knot_cycles, _ in knots])
+    return xp, fp, lengths
+
+def cycles_at(knots, thresholds):
+    # Ciclo em que o SOH ajustado de cada célula atinge cada threshold (matriz (N, T); NaN fora do intervalo da célula)
+    xp, fp, lengths = knots
+    thresholds = np.asarray(thresholds, dtype=float)
+    n_cells = len(lengths)
+    if n_cells == 0 or xp.shape[1] == 0:
+        return np.full((n_cells, len(thresholds)), np.nan)
+    rows = np.arange(n_cells)
+    soh_min = xp[:, 0]
+    soh_max = xp[rows, np.maximum(lengths - 1, 0)]
+    valid = (thresholds[None, :] >= soh_min[:, None]) & (thresholds[None, :] <= soh_max[:, None]) & (lengths[:, None] > 0)
+    x = np.broadcast_to(thresholds, (n_cells, len(thresholds)))
+    return np.where(valid, _batched_interp(x, xp, fp, lengths), np.nan)
+
+def ncd_from_knots(knots, step=0.01):
+    # NCD a cada 'step' de SOH a partir dos nós (sem refazer o ajuste), no mesmo formato de ncd_batch
+    return _ncd_fit(np.diff(cycles_at(knots, soh_thresholds(step)), axis=1))
+
+def ncd_values(ncd_row):
+    # Valores de NCD de uma célula (linha de ncd_batch), sem os NaN, na ordem dos thresholds
+    return ncd_row[~np.isnan(ncd_row)]
+
+def ncd_fit(soh, cycles, step=0.01, isotonic=False):
+    # Atalho para uma única célula: retorna (valores de NCD, mu, sigma)
+    ncd, mu, sigma = ncd_batch([np.asarray(soh, dtype=float)], [np.asarray(cycles, dtype=float)], step, isotonic)
+    return ncd_values(ncd[0]), mu[0], sigma[0]
@@ -0,0 +1,85 @@
+#### Canal estruturado de progresso das simulações
+# Converte a saída do simulador em registros estruturados e mantém um estado de tamanho fixo:
+# - linhas "[####    ] 45%" viram registros {'tipo': 'progresso', 'percentual': 45.0}; linhas JSON ({"percentual": ...}) também são aceitas;
+# - as demais linhas vão para um buffer circular com as últimas MAX_LINHAS_LOG linhas;
+# - a ETA é estimada pelo tempo decorrido e pelo percentual concluído;
+# - pronto_para_emitir() limita a frequência de atualizações da interface (INTERVALO_MIN_S),
+#   então o custo de exibição não cresce com a duração da simulação.
+
+from collections import deque
+import json
+import time
+import re
+
+MAX_LINHAS_LOG = 200
+INTERVALO_MIN_S = 0.25
+
+_RE_PERCENTUAL = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+
+def parse_line(linha):
+    # Retorna um registro {'tipo': 'progresso', 'percentual': float} ou {'tipo': 'log', 'texto': str}
+    linha = linha.replace('\r', '').rstrip('\n')
+    texto = linha.strip()
+    if texto.startswith('{'):
+        try:
+            registro = json.loads(texto)
+            if 'percentual' in registro:
+                return {'tipo': 'progresso', 'percentual': float(registro['percentual'])}
+            return {'tipo': 'log', 'texto': registro.get('texto', texto)}
+        except (json.JSONDecodeError, TypeError, ValueError, AttributeError):
+            pass
+    if texto.startswith('[') and '%' in texto:
+        encontrado = _RE_PERCENTUAL.search(texto)
+        if encontrado:
+            return {'tipo': 'progresso', 'percentual': float(encontrado.group(1))}
+    return {'tipo': 'log', 'texto': linha}
+
+class CanalProgresso:
+    def __init__(self, max_linhas=MAX_LINHAS_LOG, intervalo_min_s=INTERVALO_MIN_S):
+        self.log = deque(maxlen=max_linhas)
+        self.percentual = 0.0
+        self.inicio = time.monotonic()
+        self.intervalo_min_s = intervalo_min_s
+        self._ultima_emissao = float('-inf')
+
+    def feed(self, linha):
+        # Processa uma linha do simulador e retorna o registro correspondente
+        registro = parse_line(linha)
+        if registro['tipo'] == 'progresso':
+            self.percentual = min(max(registro['percentual'], 0.0), 100.0)
+        else:
+            self.log.append(registro['texto'])
+        return registro
+
+    def atualizar(self, concluidos, total):
+        # Progresso informado diretamente (ex.: motor em Python, por blocos de replicações)
+        self.percentual = 100.0 * concluidos / total if total else 100.0
+
+    def eta_s(self):
+        decorrido = time.monotonic() - self.inicio
+        if self.percentual <= 0: return None
+        return decorrido * (100.0 - self.percentual) / self.percentual
+
+    def pronto_para_emitir(self, forcar=False):
+        # True no máximo uma vez a cada intervalo_min_s (ou sempre, com forcar=True)
+        agora = time.monotonic()
+        if forcar or agora - self._ultima_emissao >= self.intervalo_min_s:
+            self._ultima_emissao = agora
+            return True
+        return False
+
+    def snapshot(self):
+        # Estado atual: percentual, ETA, tempo decorrido e as últimas linhas de log
+        return {
+            'percentual': self.percentual,
+            'eta_s': self.eta_s(),
+            'decorrido_s': time.monotonic() - self.inicio,
+            'log': list(self.log),
+        }
+
+def formatar_progresso(snapshot):
+    # Texto curto para a interface: "45.0% concluído · ETA 12s"
+    texto = f"{snapshot['percentual']:.1f}% concluído"
+    if snapshot['eta_s'] is not None and snapshot['percentual'] < 100:
+        texto += f" · ETA {snapshot['eta_s']:.0f}s"
+    return texto
@@ -0,0 +1,142 @@
+#### Cache em disco dos resultados de análise (fitting e simulação de MTTA)
+# Cada resultado é salvo como um .npz cujo nome é o hash (sha256) de uma chave com a impressão digital do dataset
+# e os parâmetros da simulação. O tamanho total é limitado: ao passar do limite, os resultados usados há mais tempo
+# (LRU, pelo mtime, que é atualizado a cada acerto) são removidos. Acertos e falhas ficam contados em stats.json.
+# As sessões do Streamlit e a fila de simulações são threads do mesmo processo: os arquivos temporários têm nome único
+# (uuid) e a atualização do stats.json é protegida por um lock; uma entrada removida por outra thread é tratada como falha.
+
+import numpy as np
+import threading
+import hashlib
+import json
+import uuid
+import os
+
+CACHE_DIR = os.environ.get('MTTA_CACHE_DIR', '.mtta_cache')
+MAX_BYTES = int(os.environ.get('MTTA_CACHE_MAX_BYTES', 512 * 1024**2))
+STATS_FILE = 'stats.json'
+
+_stats_lock = threading.Lock()
+
+def make_key(**parts):
+    # Chave determinística a partir de valores simples (números, strings, None, listas/tuplas)
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def dataset_fingerprint(file_path):
+    # (caminho absoluto, tamanho, mtime) do dataset; muda sempre que o arquivo é alterado
+    stat = os.stat(file_path)
+    return [os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns]
+
+def fitting_key(file_path, limpeza=None, isotonico=False):
+    # Chave do fitting de NCD1% (μ, σ) de um arquivo de dados
+    # limpeza: perfil de soh_cleaning aplicado antes do fitting; isotonico: NCD a partir do ajuste isotônico do SOH
+    # (cada um só entra na chave quando usado)
+    extras = {} if limpeza is None else {'limpeza': limpeza}
+    if isotonico: extras['ajuste'] = 'isotonico'
+    return make_key(tipo='fitting', dataset=dataset_fingerprint(file_path), **extras)
+
+def mtta_key(mu, sigma, num_p, num_s, pmin, sohm, architecture, motor, replicacoes, seed, file_path=None, precisao=None):
+    # Chave de uma simulação de MTTA: dataset de origem de μ/σ + todos os parâmetros da simulação
+    # precisao: precisão relativa alvo do modo adaptativo (só entra na chave quando usada)
+    dataset = dataset_fingerprint(file_path) if file_path and os.path.exists(file_path) else None
+    extras = {} if precisao is None else {'precisao': float(precisao)}
+    return make_key(
+        tipo='mtta', dataset=dataset, mu=float(mu), sigma=float(sigma), num_p=num_p, num_s=num_s, pmin=pmin,
+        sohm=sohm, architecture=architecture, replicacoes=replicacoes, seed=seed, motor=motor, **extras
+    )
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.npz")
+
+def _tmp_path(path):
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+def _entries(cache_dir):
+    # [(mtime_ns, tamanho, caminho)] das entradas; as removidas durante a varredura (por outra thread) são ignoradas
+    entries = []
+    if not os.path.isdir(cache_dir): return entries
+    for entry in os.scandir(cache_dir):
+        if not entry.name.endswith('.npz'): continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    return entries
+
+def _read_counters(cache_dir):
+    counters = {'hits': 0, 'misses': 0}
+    try:
+        with open(os.path.join(cache_dir, STATS_FILE), 'r', encoding='utf-8') as f:
+            counters.update(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return counters
+
+def read_stats(cache_dir=CACHE_DIR):
+    # Contadores + número e tamanho das entradas (varre a pasta: usar só para exibição, não a cada get)
+    stats = _read_counters(cache_dir)
+    entries = _entries(cache_dir)
+    stats['entries'] = len(entries)
+    stats['bytes'] = sum(size for _, size, _ in entries)
+    return stats
+
+def _count(field, cache_dir):
+    with _stats_lock:
+        os.makedirs(cache_dir, exist_ok=True)
+        counters = _read_counters(cache_dir)
+        counters[field] += 1
+        path = os.path.join(cache_dir, STATS_FILE)
+        tmp_path = _tmp_path(path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'hits': counters['hits'], 'misses': counters['misses']}, f)
+        os.replace(tmp_path, path)
+
+def get(key, cache_dir=CACHE_DIR):
+    # Retorna o dicionário de arrays salvo com a chave, ou None se não estiver no cache
+    path = _entry_path(key, cache_dir)
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            result = {name: data[name] for name in data.files}
+    except (FileNotFoundError, OSError, ValueError):
+        _count('misses', cache_dir)
+        return None
+    try:
+        os.utime(path)  # marca como usado recentemente (LRU)
+    except FileNotFoundError:
+        pass  # removida por outra thread depois da leitura; o resultado lido continua válido
+    _count('hits', cache_dir)
+    return result
+
+def put(key, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, **arrays):
+    # Salva os arrays com a chave e aplica o limite de tamanho do cache
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(key, cache_dir)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes)
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    # Remove os resultados menos recentemente usados até o cache caber em max_bytes
+    entries = sorted(_entries(cache_dir))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes: break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            total -= size  # já removida por outra thread
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+def clear(cache_dir=CACHE_DIR):
+    if not os.path.isdir(cache_dir): return
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.npz') or entry.name == STATS_FILE:
+            os.remove(entry.path)
@@ -0,0 +1,153 @@
+#### Fila de simulações compartilhada entre as sessões do Streamlit
+# Um único pool de threads (por processo do servidor) limita quantas simulações rodam ao mesmo tempo.
+# - Cada job tem seu próprio diretório de saída (JOBS_DIR/<id>-<sufixo>/, removido ao final), então sessões diferentes não sobrescrevem resultados.
+# - Submissões com a mesma chave (mesmos parâmetros) são unidas em um único job, compartilhado pelas sessões.
+# - Um job é cancelado quando nenhuma sessão o quer mais: a sessão submeteu uma nova análise ou parou de dar sinal de vida
+#   (sem heartbeat por mais de SESSION_TIMEOUT_S, por exemplo, aba fechada).
+# - status() não bloqueia: a interface consulta periodicamente o estado do job.
+# As funções executadas pelos jobs rodam fora da thread do script e, portanto, não devem chamar st.*.
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import hashlib
+import uuid
+import shutil
+import time
+import os
+
+MAX_WORKERS = int(os.environ.get('SIMULATION_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+SESSION_TIMEOUT_S = float(os.environ.get('SIMULATION_SESSION_TIMEOUT_S', 120))
+JOB_TTL_S = float(os.environ.get('SIMULATION_JOB_TTL_S', 600))
+JOBS_DIR = os.path.join('MTTA-Output', 'jobs')
+
+PENDENTE, EXECUTANDO, CONCLUIDO, ERRO, CANCELADO = 'pendente', 'executando', 'concluido', 'erro', 'cancelado'
+ATIVOS = (PENDENTE, EXECUTANDO)
+
+class JobCancelado(Exception):
+    pass
+
+_lock = threading.Lock()
+_executor = None
+_jobs = {}       # id -> job (dicionário)
+_sessoes = {}    # id da sessão -> último heartbeat (time.monotonic)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='simulacao')
+    return _executor
+
+def job_id(chave):
+    return hashlib.sha1(chave.encode('utf-8')).hexdigest()[:16]
+
+def _novo_job(id_job, sessao):
+    return {
+        'id': id_job,
+        'status': PENDENTE,
+        'resultado': None,
+        'erro': None,
+        'sessoes': {sessao},
+        'future': None,
+        'processo': None,
+        'cancelado': threading.Event(),
+        'progresso': None,   # snapshot do progress_channel.CanalProgresso
+        'output_dir': os.path.join(JOBS_DIR, f"{id_job}-{uuid.uuid4().hex[:8]}") + os.sep,
+        'atualizado': time.monotonic(),
+    }
+
+def _rodar(job, funcao):
+    with _lock:
+        if job['cancelado'].is_set():
+            job['status'], job['atualizado'] = CANCELADO, time.monotonic()
+            return
+        job['status'] = EXECUTANDO
+    try:
+        os.makedirs(job['output_dir'], exist_ok=True)
+        resultado = funcao(job)
+        status, erro = (CANCELADO, None) if job['cancelado'].is_set() else (CONCLUIDO, None)
+    except JobCancelado:
+        resultado, status, erro = None, CANCELADO, None
+    except Exception as e:
+        resultado, status, erro = None, ERRO, f"{type(e).__name__}: {e}"
+    finally:
+        job['processo'] = None
+        shutil.rmtree(job['output_dir'], ignore_errors=True)
+    with _lock:
+        job['resultado'], job['status'], job['erro'] = resultado, status, erro
+        job['atualizado'] = time.monotonic()
+
+def _cancelar(job):
+    # Deve ser chamado com _lock adquirido
+    job['cancelado'].set()
+    if job['future'] is not None and job['future'].cancel():
+        job['status'] = CANCELADO
+    processo = job['processo']
+    if processo is not None and processo.poll() is None:
+        processo.terminate()
+
+def _liberar_sessao(sessao, exceto=None):
+    # Deve ser chamado com _lock adquirido. Remove a sessão dos jobs e cancela os que ficarem sem sessões
+    for job in _jobs.values():
+        if job['id'] == exceto or sessao not in job['sessoes']: continue
+        job['sessoes'].discard(sessao)
+        if not job['sessoes'] and job['status'] in ATIVOS:
+            _cancelar(job)
+
+def _limpar():
+    # Deve ser chamado com _lock adquirido. Libera sessões sem heartbeat e esquece jobs finalizados antigos
+    agora = time.monotonic()
+    for sessao, visto in list(_sessoes.items()):
+        if agora - visto > SESSION_TIMEOUT_S:
+            del _sessoes[sessao]
+            _liberar_sessao(sessao)
+    for id_job, job in list(_jobs.items()):
+        if job['status'] not in ATIVOS and agora - job['atualizado'] > JOB_TTL_S:
+            del _jobs[id_job]
+
+def heartbeat(sessao):
+    # Marca a sessão como ativa. A interface deve chamar a cada execução do script (status() também chama)
+    with _lock:
+        _sessoes[sessao] = time.monotonic()
+        _limpar()
+
+def submit(chave, funcao, sessao, resultado=None):
+    # Submete um job identificado pela chave e o associa à sessão; retorna o id do job.
+    # funcao(job) roda no pool e retorna o resultado. Se 'resultado' for informado (ex.: veio do cache), o job já nasce concluído.
+    # Jobs anteriores da mesma sessão são liberados (e cancelados, se nenhuma outra sessão os quiser).
+    id_job = job_id(chave)
+    with _lock:
+        _sessoes[sessao] = time.monotonic()
+        _limpar()
+        _liberar_sessao(sessao, exceto=id_job)
+
+        job = _jobs.get(id_job)
+        if job is not None and job['status'] in ATIVOS + (CONCLUIDO,) and not job['cancelado'].is_set():
+            job['sessoes'].add(sessao)
+            return id_job
+
+        job = _novo_job(id_job, sessao)
+        _jobs[id_job] = job
+        if resultado is not None:
+            job['status'], job['resultado'] = CONCLUIDO, resultado
+            return id_job
+        job['future'] = _get_executor().submit(_rodar, job, funcao)
+    return id_job
+
+def status(id_job, sessao=None):
+    # Estado atual do job, sem bloquear: {'status', 'resultado', 'erro', 'progresso', 'posicao'}
+    with _lock:
+        if sessao is not None:
+            _sessoes[sessao] = time.monotonic()
+            _limpar()
+        job = _jobs.get(id_job)
+        if job is None:
+            return {'status': None, 'resultado': None, 'erro': "Job não encontrado.", 'progresso': None, 'posicao': None}
+        # Posição na fila entre os jobs pendentes (0 = próximo a rodar)
+        pendentes = [j['id'] for j in _jobs.values() if j['status'] == PENDENTE]
+        posicao = pendentes.index(id_job) if id_job in pendentes else None
+        return {'status': job['status'], 'resultado': job['resultado'], 'erro': job['erro'], 'progresso': job['progresso'], 'posicao': posicao}
+
+def cancel(sessao):
+    # Libera todos os jobs da sessão (ex.: ao sair da página)
+    with _lock:
+        _liberar_sessao(sessao)
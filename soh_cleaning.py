@@ -0,0 +1,214 @@
+#### Limpeza do SOH antes do fitting de NCD1%, com os filtros dos notebooks SOH-Analysis/SOH outliers *.ipynb
+# Etapas (as mesmas dos notebooks, na mesma ordem):
+#   1. SOH por ciclo com a capacidade nominal do fabricante (prefixo do nome do arquivo), como nos notebooks;
+#   2. filtros do SOH: ensure_non_increasing -> z-score (1.5) -> sharp jump (5% de SOH, 2 repetições);
+#   3. NCD1% de cada célula e remoção de outliers do NCD1% (IQR, limites q1 - 1.5*IQR e q3 + 1.5*IQR).
+#      O rmv_outliers_boxplot do notebook da Michigan Formation usa q1*IQR e q3*IQR, que dependem da escala do NCD1%
+#      (só mantinham valores porque lá o IQR era ~1); aqui a Michigan Formation usa os limites padrão do IQR.
+# Cada instituição pode ter um perfil próprio em PROFILES; as que não aparecem usam o perfil 'default'.
+# Os filtros rodam num DataFrame "longo" com todas as células (coluna 'cell'), vetorizados por groupby, e o NCD1% de todas
+# as células sai de uma vez de ncd.ncd_batch. A leitura dos arquivos é feita em paralelo (ProcessPoolExecutor).
+# O sharp jump com 'repeat' repetições é calculado numa única varredura (de trás para frente) por célula.
+#
+# Uso: python soh_cleaning.py [--workers N]  -> gera OUTPUT_FILE com μ/σ do NCD1% limpo de todos os arquivos
+
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+import argparse
+import warnings
+import os
+from cycle_stats import load_cycle_frames
+from ncd import ncd_batch, ncd_values
+
+try:
+    from sklearn.ensemble import IsolationForest
+except ImportError:  # sklearn é opcional: só o filtro 'isolation_forest' depende dele
+    IsolationForest = None
+
+DATA_DIR = 'Battery_Archive_Data_NoSubDirs'
+OUTPUT_FILE = 'Metadata-analysis/HeadersOutput/ncd_clean.csv'
+
+DEFAULT_PROFILE = {
+    'nominal': 'rated',  # 'rated': capacidade do prefixo do arquivo; 'max': máxima global (como o rodar_fitting)
+    'soh_filters': [
+        ('non_increasing', {}),
+        ('zscore', {'threshold': 1.5}),
+        ('sharp_jump', {'threshold': 0.05, 'repeat': 2}),
+    ],
+    'ncd_filter': 'iqr',
+}
+PROFILES = {
+    'default': DEFAULT_PROFILE,
+    'Michigan Formation': DEFAULT_PROFILE,
+}
+
+# Segundo elemento do nome do arquivo -> instituição (mesmos nomes das subpastas da Battery Archive)
+INSTITUTION_TOKENS = {'CALCE': 'CALCE', 'HNEI': 'HNEI', 'MICH': 'Michigan Expansion', 'OX': 'Oxford', 'SNL': 'SNL', 'UL-PUR': 'UL-Purdue'}
+
+def institution_of(file_name):
+    components = os.path.basename(file_name).split('_')
+    if len(components) < 2: return None
+    if components[1] == 'MICH' and 'BLForm' in os.path.basename(file_name):
+        return 'Michigan Formation'
+    return INSTITUTION_TOKENS.get(components[1], components[1])
+
+def profile_for(file_name):
+    # Nome do perfil (chave de PROFILES) de um arquivo
+    institution = institution_of(file_name)
+    return institution if institution in PROFILES else 'default'
+
+def rated_capacity(file_name):
+    # Capacidade nominal do prefixo adicionado por RenameArchiveCapacity.py (ex.: "1.35_CALCE_...")
+    try:
+        return float(os.path.basename(file_name).split('_')[0])
+    except ValueError:
+        return None
+
+# --- Filtros do SOH: recebem o DataFrame longo (colunas 'cell', 'Cycle_Index', column) e retornam a máscara das linhas mantidas ---
+def _non_increasing(df, column):
+    # Mantém os passos de queda ou estabilidade em relação à linha anterior (a primeira linha de cada célula é mantida)
+    return (df.groupby('cell', sort=False)[column].diff().fillna(-1) <= 0).to_numpy()
+
+def _zscore(df, column, threshold=3.0):
+    # z-score com desvio-padrão populacional (como scipy.stats.zscore)
+    grouped = df.groupby('cell', sort=False)[column]
+    z = (df[column] - grouped.transform('mean')) / grouped.transform('std', ddof=0)
+    return (z.abs() <= threshold).to_numpy()
+
+def _iqr(df, column):
+    grouped = df.groupby('cell', sort=False)[column]
+    q1, q3 = grouped.transform('quantile', 0.25), grouped.transform('quantile', 0.75)
+    iqr = q3 - q1
+    return ((df[column] >= q1 - 1.5 * iqr) & (df[column] <= q3 + 1.5 * iqr)).to_numpy()
+
+def _isolation_forest(df, column, contamination='auto'):
+    if IsolationForest is None:
+        raise ImportError("O filtro 'isolation_forest' requer o scikit-learn.")
+    keep = np.ones(len(df), dtype=bool)
+    for _, positions in df.groupby('cell', sort=False).indices.items():
+        model = IsolationForest(contamination=contamination, random_state=123)
+        keep[positions] = model.fit_predict(df[column].to_numpy()[positions].reshape(-1, 1)) == 1
+    return keep
+
+def sharp_jump_mask(values, threshold, repeat=1):
+    # Equivale a aplicar 'repeat' vezes o filtro do notebook (remover i se |x[próximo] - x[i]| > threshold, com o
+    # próximo contado entre as linhas que sobraram da passada anterior), numa única varredura de trás para frente.
+    # removed_at[i] = passada (1..repeat) em que i sai, 0 = nunca; present[t] = primeira linha >= i que participa da passada t
+    values = np.asarray(values, dtype=float).tolist()
+    n = len(values)
+    removed_at = [0] * n
+    if n == 0 or repeat < 1: return np.ones(n, dtype=bool)
+    present = [n - 1] * repeat  # a última linha nunca sai
+    for i in range(n - 2, -1, -1):
+        for t in range(repeat):
+            jump = abs(values[present[t]] - values[i]) > threshold
+            present[t] = i  # mesmo removida na passada t, a linha i ainda faz parte dela
+            if jump:
+                removed_at[i] = t + 1
+                break
+    return np.array([r == 0 for r in removed_at], dtype=bool)
+
+def _sharp_jump(df, column, threshold, repeat=1):
+    keep = np.ones(len(df), dtype=bool)
+    values = df[column].to_numpy()
+    for _, positions in df.groupby('cell', sort=False).indices.items():
+        keep[positions] = sharp_jump_mask(values[positions], threshold, repeat)
+    return keep
+
+SOH_FILTERS = {'non_increasing': _non_increasing, 'zscore': _zscore, 'iqr': _iqr, 'isolation_forest': _isolation_forest, 'sharp_jump': _sharp_jump}
+
+def clean_soh(df, filters, column='SOH_discharge'):
+    # Aplica os filtros em sequência (cada um sobre o resultado do anterior), em todas as células de uma vez
+    for name, params in filters:
+        df = df[SOH_FILTERS[name](df, column, **params)]
+    return df
+
+# --- Outliers do NCD1% (matriz de ncd_batch, uma linha por célula; NaN = sem valor) ---
+def ncd_outlier_mask(ncd, method='iqr'):
+    # Máscara dos valores mantidos, calculada por linha (célula) de forma vetorizada
+    if method is None or ncd.size == 0: return ~np.isnan(ncd)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # linhas só com NaN (células sem NCD1%)
+        q1, q3 = np.nanquantile(ncd, 0.25, axis=1, keepdims=True), np.nanquantile(ncd, 0.75, axis=1, keepdims=True)
+    iqr = q3 - q1
+    if method != 'iqr':
+        raise ValueError(f"Filtro de NCD1% desconhecido: {method}")
+    lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+    with np.errstate(invalid='ignore'):
+        return (ncd >= lower) & (ncd <= upper)
+
+# --- Pipeline ---
+def load_cell(file_path, profile=None):
+    # SOH por ciclo de um arquivo, com a capacidade nominal do perfil. Retorna o DataFrame (Cycle_Index, SOH_discharge)
+    profile = PROFILES[profile or profile_for(file_path)]
+    nominal = rated_capacity(file_path) if profile['nominal'] == 'rated' else None
+    cycles_capacity, _ = load_cycle_frames(file_path, nominal_capacity=nominal)
+    return cycles_capacity[['Cycle_Index', 'SOH_discharge']]
+
+def clean_fit_cells(cells, profiles=None):
+    # cells: {nome: DataFrame com Cycle_Index e SOH_discharge}; profiles: {nome: perfil} (padrão: profile_for(nome))
+    # As células de um mesmo perfil são limpas e ajustadas juntas. Retorna um DataFrame com, por célula: ciclos antes e
+    # depois da limpeza, nº de NCD1% mantidos, μ e σ (ajuste normal, como o ncd_fit; NaN com menos de 2 valores)
+    profiles = profiles or {name: profile_for(name) for name in cells}
+    rows = []
+    for profile_name in dict.fromkeys(profiles[name] for name in cells):
+        profile = PROFILES[profile_name]
+        names = [name for name in cells if profiles[name] == profile_name]
+        long_df = pd.concat([cells[name][['Cycle_Index', 'SOH_discharge']].assign(cell=name) for name in names], ignore_index=True)
+        cleaned = clean_soh(long_df, profile['soh_filters'])
+
+        by_cell = dict(tuple(cleaned.groupby('cell', sort=False)))
+        soh_curves = [by_cell[name]['SOH_discharge'].to_numpy(dtype=float) if name in by_cell else np.empty(0) for name in names]
+        cycle_curves = [by_cell[name]['Cycle_Index'].to_numpy(dtype=float) if name in by_cell else np.empty(0) for name in names]
+        ncd, _, _ = ncd_batch(soh_curves, cycle_curves)
+        values = np.where(ncd_outlier_mask(ncd, profile['ncd_filter']), ncd, np.nan)
+        count = np.sum(~np.isnan(values), axis=1)
+        enough = count >= 2
+        mu, sigma = np.full(len(names), np.nan), np.full(len(names), np.nan)
+        if np.any(enough):
+            mu[enough] = np.nanmean(values[enough], axis=1)
+            sigma[enough] = np.nanstd(values[enough], axis=1)
+
+        for i, name in enumerate(names):
+            rows.append({'cell': name, 'profile': profile_name, 'cycles': len(cells[name]), 'cycles_kept': len(soh_curves[i]),
+                         'ncd_count': int(count[i]), 'mu': mu[i], 'sigma': sigma[i]})
+    return pd.DataFrame(rows, columns=['cell', 'profile', 'cycles', 'cycles_kept', 'ncd_count', 'mu', 'sigma'])
+
+def clean_fit(file_path, isotonic=False):
+    # Atalho para um arquivo (usado pelo rodar_fitting), no formato do ncd.ncd_fit: (valores de NCD1% mantidos, μ, σ)
+    profile = PROFILES[profile_for(file_path)]
+    cleaned = clean_soh(load_cell(file_path).assign(cell=file_path), profile['soh_filters'])
+    ncd, _, _ = ncd_batch([cleaned['SOH_discharge'].to_numpy(dtype=float)], [cleaned['Cycle_Index'].to_numpy(dtype=float)], isotonic=isotonic)
+    data = ncd_values(np.where(ncd_outlier_mask(ncd, profile['ncd_filter']), ncd, np.nan)[0])
+    if len(data) < 2: return data, np.nan, np.nan
+    return data, float(np.mean(data)), float(np.std(data))
+
+def clean_fit_files(file_paths, workers=None):
+    # Lê os arquivos em paralelo e limpa/ajusta todos juntos; arquivos com erro de leitura ficam de fora (e são listados)
+    cells, errors = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {file_path: executor.submit(load_cell, file_path) for file_path in file_paths}
+        for file_path, future in futures.items():
+            try:
+                cells[file_path] = future.result()
+            except Exception as e:
+                errors[file_path] = f"{type(e).__name__}: {e}"
+    return clean_fit_cells(cells) if cells else pd.DataFrame(), errors
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Limpa o SOH (perfis por instituição) e ajusta o NCD1% de todos os arquivos timeseries.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Número de processos para a leitura (padrão: número de núcleos)")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    files = [os.path.join(DATA_DIR, f) for f in sorted(os.listdir(DATA_DIR)) if f.endswith('.csv') and 'timeseries' in f]
+    result, errors = clean_fit_files(files, workers=args.workers)
+    for file_path, error in errors.items():
+        print(f"    Erro ao processar o arquivo '{file_path}': {error}. Pulando.")
+    if not result.empty:
+        result.insert(0, 'Full Filename', result.pop('cell').map(os.path.basename))
+        result = result.rename(columns={'mu': 'Mean NCD1%', 'sigma': 'Std NCD1%'})
+    result.to_csv(OUTPUT_FILE, index=False)
+    print(f"\nProcessamento concluído. Resultados salvos em '{OUTPUT_FILE}'")
@@ -0,0 +1,152 @@
+#### Gerador de dados sintéticos no formato do Battery Archive
+# Arquivos *_timeseries.csv com o header padrão (Metadata-analysis/HeadersOutput/headers_summary.md), nome no formato
+# "<capacidade>_<instituição>_<célula>_..._timeseries.csv" (o mesmo de RenameArchiveCapacity.py) e ciclos de carga e
+# descarga com degradação do SOH, ruído e quedas ocasionais, para medir desempenho sem os dados reais.
+# O arquivo é gerado e escrito em blocos de ciclos, então a memória não depende do número de linhas (10 mil a 50 milhões);
+# os valores são arredondados a 6 casas decimais e, com o pyarrow instalado, os blocos são escritos pelo writer de CSV dele.
+# Também gera listas de nomes e catálogos (como filenames.csv) de qualquer tamanho, a partir dos valores reais do catálogo.
+#
+# Uso: python synthetic_data.py --rows 1M [--rows 10M ...] [--out .bench_data] [--seed 0]
+
+import pandas as pd
+import numpy as np
+import argparse
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # sem pyarrow, os blocos são escritos com o DataFrame.to_csv (bem mais lento)
+    pa = pa_csv = None
+
+TIMESERIES_HEADER = ['Date_Time', 'Test_Time (s)', 'Cycle_Index', 'Current (A)', 'Voltage (V)', 'Charge_Capacity (Ah)',
+                     'Discharge_Capacity (Ah)', 'Charge_Energy (Wh)', 'Discharge_Energy (Wh)', 'Environment_Temperature (C)',
+                     'Cell_Temperature (C)']
+CATALOG_FILE = 'Metadata-analysis/HeadersOutput/filenames.csv'
+OUTPUT_DIR = '.bench_data'
+ROWS_PER_BLOCK = 1_000_000
+START_TIME = np.datetime64('2020-01-01T00:00:00')
+
+def parse_size(text):
+    # "10k", "1M", "50M", "2500" -> número de linhas
+    text = str(text).strip().upper()
+    multiplier = {'K': 1_000, 'M': 1_000_000, 'G': 1_000_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if multiplier > 1 else text) * multiplier)
+
+def timeseries_name(rows, seed=0, capacity=3.0):
+    return f"{capacity:g}_SYN_S{rows}-{seed}_18650_NMC_25C_0-100_0.5-1C_a_timeseries.csv"
+
+def default_cycles(rows):
+    # Até ~2000 ciclos (ordem de grandeza das células reais), com pelo menos 20 linhas por ciclo
+    return int(np.clip(rows // 20, 1, 2000))
+
+def soh_curve(n_cycles, rng, end_soh=0.7, noise=0.002, drop_rate=0.01):
+    # SOH por ciclo: queda suave até end_soh, ruído de medição e quedas pontuais (outliers, como nos dados reais)
+    x = np.arange(n_cycles) / max(n_cycles - 1, 1)
+    soh = 1.0 - (1.0 - end_soh) * x ** 1.3 + rng.normal(0, noise, n_cycles)
+    drops = rng.random(n_cycles) < drop_rate
+    soh[drops] -= rng.uniform(0.05, 0.2, drops.sum())
+    return np.clip(soh, 0.05, 1.05)
+
+def _cycle_block(first_cycle, row_counts, soh, capacity, time_offset, rng):
+    # Linhas de um bloco de ciclos: metade carga, metade descarga, com uma linha de repouso no fim de cada ciclo
+    n = int(row_counts.sum())
+    cycle = np.repeat(np.arange(first_cycle, first_cycle + len(row_counts)), row_counts)
+    starts = np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+    k = np.repeat(row_counts, row_counts)
+    j = np.arange(n) - starts
+    half = np.maximum((k - 1) // 2, 1)
+    charging = j < half
+    resting = j == k - 1
+    frac = np.where(charging, (j + 1) / half, (j - half + 1) / np.maximum(k - 1 - half, 1)).clip(0, 1)
+    cap = capacity * np.repeat(soh, row_counts)
+
+    current = np.where(charging, 0.5 * capacity, -1.0 * capacity) * (1 + rng.normal(0, 0.01, n))
+    current[resting] = 0.0
+    voltage = np.where(charging, 3.6 + 0.6 * frac, 4.2 - 1.2 * frac) + rng.normal(0, 0.002, n)
+    charge_capacity = np.where(charging, cap * frac, cap)
+    discharge_capacity = np.where(charging, 0.0, cap * frac)
+    time = time_offset + np.cumsum(rng.uniform(8.0, 12.0, n))
+    temperature = 25.0 + 3.0 * np.where(charging, frac, 1 - frac) + rng.normal(0, 0.2, n)
+    return pd.DataFrame({
+        'Date_Time': (START_TIME + time.astype('timedelta64[s]')).astype(str),
+        'Test_Time (s)': time,
+        'Cycle_Index': cycle,
+        'Current (A)': current,
+        'Voltage (V)': voltage,
+        'Charge_Capacity (Ah)': charge_capacity,
+        'Discharge_Capacity (Ah)': discharge_capacity,
+        'Charge_Energy (Wh)': charge_capacity * 3.9,
+        'Discharge_Energy (Wh)': discharge_capacity * 3.6,
+        'Environment_Temperature (C)': 25.0,
+        'Cell_Temperature (C)': temperature,
+    }, columns=TIMESERIES_HEADER)
+
+def _write_block(f, block):
+    block = block.round(6)
+    if pa_csv is not None:
+        table = pa.Table.from_pandas(block, preserve_index=False)
+        pa_csv.write_csv(table, f, pa_csv.WriteOptions(include_header=False, quoting_style='none'))
+    else:
+        block.to_csv(f, header=False, index=False)
+
+def generate_timeseries(path, rows, cycles=None, capacity=3.0, seed=0, rows_per_block=ROWS_PER_BLOCK):
+    # Escreve um arquivo timeseries com exatamente 'rows' linhas e retorna o caminho
+    rng = np.random.default_rng(seed)
+    cycles = min(cycles or default_cycles(rows), rows)
+    row_counts = np.full(cycles, rows // cycles)
+    row_counts[:rows % cycles] += 1
+    soh = soh_curve(cycles, rng)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    cycles_per_block = max(1, int(rows_per_block // row_counts.max()))
+    time_offset = 0.0
+    with open(tmp_path, 'wb') as f:
+        f.write((','.join(TIMESERIES_HEADER) + '\n').encode('utf-8'))
+        for first in range(0, cycles, cycles_per_block):
+            block = _cycle_block(first + 1, row_counts[first:first + cycles_per_block], soh[first:first + cycles_per_block], capacity, time_offset, rng)
+            time_offset = block['Test_Time (s)'].iloc[-1]
+            _write_block(f, block)
+    os.replace(tmp_path, path)
+    return path
+
+def ensure_timeseries(rows, seed=0, out_dir=OUTPUT_DIR):
+    # Reaproveita o arquivo se ele já tiver sido gerado com os mesmos parâmetros
+    path = os.path.join(out_dir, timeseries_name(rows, seed))
+    if not os.path.exists(path):
+        generate_timeseries(path, rows, seed=seed)
+    return path
+
+def synthetic_catalog(n, seed=0, catalog_file=CATALOG_FILE):
+    # Catálogo com n linhas e as mesmas colunas do filenames.csv; cada coluna é sorteada entre os valores reais
+    rng = np.random.default_rng(seed)
+    real = pd.read_csv(catalog_file)
+    catalog = pd.DataFrame({column: real[column].to_numpy()[rng.integers(0, len(real), n)] for column in real.columns})
+    catalog['Cell ID'] = [f"S{i}" for i in range(n)]
+    catalog['Full Filename'] = [f"{c:g}_SYN_S{i}_timeseries.csv" for i, c in enumerate(catalog['Capacity (Ah)'])]
+    return catalog
+
+def synthetic_names(n, seed=0, catalog_file=CATALOG_FILE):
+    # n nomes de arquivo sorteados (com repetição) entre os nomes reais, já que o formato varia por instituição
+    rng = np.random.default_rng(seed)
+    real = pd.read_csv(catalog_file)['Full Filename'].to_numpy()
+    return real[rng.integers(0, len(real), n)].tolist()
+
+def write_names(path, names):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(names) + '\n')
+    return path
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gera arquivos timeseries sintéticos no formato do Battery Archive.")
+    parser.add_argument('--rows', action='append', default=None, help="Linhas por arquivo (ex.: 10k, 1M, 50M); pode repetir")
+    parser.add_argument('--out', default=OUTPUT_DIR, help=f"Pasta de saída (padrão: {OUTPUT_DIR})")
+    parser.add_argument('--seed', type=int, default=0, help="Semente do gerador")
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    args = parse_args()
+    for size in args.rows or ['10k']:
+        print(f"Gerado: {ensure_timeseries(parse_size(size), args.seed, args.out)}")
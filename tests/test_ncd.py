@@ -0,0 +1,48 @@
+# Compara o NCD1% em lote (ncd.ncd_batch / ncd_fit) com o cálculo original do rodar_fitting (np.interp + norm.fit)
+import os
+import sys
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ncd import ncd_batch, ncd_fit, ncd_values
+
+def baseline_ncd(soh, cycles):
+    # Mesmo pipeline do rodar_fitting original (commit baseline)
+    thresholds = np.arange(1.00, 0.00, -0.01)
+    xp, fp = soh[::-1], cycles[::-1]
+    valid_thresholds = thresholds[(thresholds >= xp.min()) & (thresholds <= xp.max())]
+    estimated = np.interp(valid_thresholds, xp, fp)
+    return np.diff(estimated)
+
+def noisy_curves(n_cells, noise, seed=0):
+    rng = np.random.default_rng(seed)
+    soh_curves, cycle_curves = [], []
+    for _ in range(n_cells):
+        n = int(rng.integers(20, 800))
+        cycles = np.arange(1, n + 1, dtype=float)
+        soh = 1.0 - np.cumsum(rng.random(n) * 0.001) + rng.normal(0, noise, n)
+        soh_curves.append(soh)
+        cycle_curves.append(cycles)
+    return soh_curves, cycle_curves
+
+@pytest.mark.parametrize('noise', [0.0, 0.001, 0.005, 0.02])
+def test_ncd_batch_matches_baseline_on_noisy_curves(noise):
+    soh_curves, cycle_curves = noisy_curves(300, noise, seed=int(noise * 1000))
+    ncd, mu, sigma = ncd_batch(soh_curves, cycle_curves)
+    for i, (soh, cycles) in enumerate(zip(soh_curves, cycle_curves)):
+        expected = baseline_ncd(soh, cycles)
+        np.testing.assert_allclose(ncd_values(ncd[i]), expected, rtol=1e-9, atol=1e-9)
+        if len(expected) >= 2:
+            expected_mu, expected_sigma = norm.fit(expected)
+            assert mu[i] == pytest.approx(expected_mu, rel=1e-9, abs=1e-9)
+            assert sigma[i] == pytest.approx(expected_sigma, rel=1e-9, abs=1e-9)
+
+def test_ncd_fit_single_noisy_curve():
+    soh_curves, cycle_curves = noisy_curves(1, 0.005, seed=42)
+    data, mu, sigma = ncd_fit(soh_curves[0], cycle_curves[0])
+    expected = baseline_ncd(soh_curves[0], cycle_curves[0])
+    np.testing.assert_allclose(data, expected)
+    assert (mu, sigma) == pytest.approx(norm.fit(expected))
@@ -0,0 +1,117 @@
+#### Cache colunar dos arquivos *_timeseries.csv
+# Cada CSV é convertido uma única vez para Parquet (via pyarrow) e as leituras seguintes carregam apenas as colunas pedidas.
+# A chave do cache é (caminho absoluto, tamanho, mtime): se o CSV original mudar, uma nova conversão é feita e as
+# conversões anteriores do mesmo arquivo (mesmo prefixo, o hash do caminho) são removidas.
+# Se o pyarrow não estiver instalado ou a conversão/leitura do Parquet falhar, a leitura volta para o pd.read_csv original
+# (com um warnings.warn).
+
+import pandas as pd
+import warnings
+import hashlib
+import uuid
+import os
+
+CACHE_DIR = os.environ.get('TIMESERIES_CACHE_DIR', '.timeseries_cache')
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+def file_fingerprint(file_path):
+    # (caminho absoluto, tamanho em bytes, mtime em ns) identifica uma versão do arquivo
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+def _source_key(file_path):
+    # Prefixo comum a todas as versões de um mesmo arquivo
+    return hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+
+def cache_path(file_path, cache_dir=CACHE_DIR):
+    key = hashlib.sha1(repr(file_fingerprint(file_path)).encode('utf-8')).hexdigest()[:24]
+    return os.path.join(cache_dir, f"{_source_key(file_path)}-{key}.parquet")
+
+def _remove_stale(file_path, parquet_path, cache_dir):
+    # Remove os Parquets de versões anteriores do mesmo CSV (outro tamanho/mtime)
+    prefix = _source_key(file_path) + '-'
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and name.endswith('.parquet') and path != parquet_path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # já removido por outra sessão (ou em uso, no Windows)
+
+def _filter_columns(available, columns):
+    # Mantém a ordem pedida e ignora colunas que não existem no arquivo (mesmo comportamento do usecols com callable)
+    if columns is None: return None
+    return [c for c in columns if c in available]
+
+def _read_csv(file_path, columns=None):
+    if columns is None:
+        return pd.read_csv(file_path)
+    df = pd.read_csv(file_path, usecols=lambda c: c in columns)
+    return df[[c for c in columns if c in df.columns]]
+
+def build_cache(file_path, cache_dir=CACHE_DIR):
+    # Converte o CSV completo para Parquet. Escreve num arquivo temporário e renomeia para não deixar caches pela metade
+    parquet_path = cache_path(file_path, cache_dir)
+    if os.path.exists(parquet_path):
+        return parquet_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    df = pd.read_csv(file_path)
+    # Nome único por escrita: sessões do Streamlit e threads de jobs convertem o mesmo arquivo no mesmo processo
+    tmp_path = f"{parquet_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        df.to_parquet(tmp_path, engine='pyarrow', index=False)
+        os.replace(tmp_path, parquet_path)
+        _remove_stale(file_path, parquet_path, cache_dir)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+    return parquet_path
+
+def read_timeseries(file_path, columns=None, use_cache=True, cache_dir=CACHE_DIR):
+    # Lê um arquivo timeseries retornando apenas as colunas pedidas (ou todas, se columns=None).
+    # FileNotFoundError e erros de parsing do próprio CSV são propagados, como no pd.read_csv.
+    if not use_cache or pq is None:
+        return _read_csv(file_path, columns)
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(file_path)
+
+    try:
+        parquet_path = build_cache(file_path, cache_dir)
+        available = pq.read_schema(parquet_path).names
+        return pd.read_parquet(parquet_path, columns=_filter_columns(available, columns), engine='pyarrow')
+    except (pd.errors.EmptyDataError, pd.errors.ParserError):
+        raise
+    except Exception as e:
+        warnings.warn(f"cache colunar indisponível para '{file_path}' ({e}). Lendo o CSV diretamente.")
+        return _read_csv(file_path, columns)
+
+def clear_cache(cache_dir=CACHE_DIR):
+    # Remove todos os arquivos do cache
+    if not os.path.isdir(cache_dir): return 0
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if name.endswith('.parquet') or name.endswith('.tmp'):
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
+
+def iter_timeseries_chunks(file_path, columns=None, chunksize=500_000, cache_dir=CACHE_DIR):
+    # Itera sobre o arquivo em blocos de até 'chunksize' linhas, sem carregar tudo na memória.
+    # Usa o Parquet se ele já estiver no cache; caso contrário lê o CSV em blocos (o cache não é criado aqui, pois exigiria ler o arquivo inteiro)
+    if pq is not None:
+        parquet_path = cache_path(file_path, cache_dir)
+        if os.path.exists(parquet_path):
+            parquet_file = pq.ParquetFile(parquet_path)
+            cols = _filter_columns(parquet_file.schema_arrow.names, columns)
+            for batch in parquet_file.iter_batches(batch_size=chunksize, columns=cols):
+                yield batch.to_pandas()
+            return
+
+    usecols = None if columns is None else (lambda c: c in columns)
+    for chunk in pd.read_csv(file_path, usecols=usecols, chunksize=chunksize):
+        yield chunk if columns is None else chunk[[c for c in columns if c in chunk.columns]]